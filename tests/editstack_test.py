@@ -0,0 +1,90 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test editstack.py for vimiv's test suite."""
+
+import os
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from gi.repository import GdkPixbuf
+from PIL import Image
+from vimiv import editstack, imageactions
+
+
+class EditStackTest(TestCase):
+    """Edit Stack Tests."""
+
+    def setUp(self):
+        self.directory = mkdtemp()
+        self.path = os.path.join(self.directory, "image.png")
+        Image.new("RGB", (30, 20), (100, 150, 200)).save(self.path)
+
+    def test_push(self):
+        """Store edits composing consecutive transformations."""
+        self.assertEqual(editstack.load(self.path), [])
+        editstack.push(self.path, ("transform", imageactions.rotation(1)))
+        editstack.push(self.path, ("transform", imageactions.rotation(1)))
+        self.assertEqual(editstack.load(self.path), [("transform", (2, 0))])
+        manipulations = {"bri": 1.5, "con": 1, "sha": 1}
+        editstack.push(self.path, ("enhance", manipulations))
+        editstack.push(self.path, ("transform", imageactions.flip(True)))
+        self.assertEqual(editstack.load(self.path),
+                         [("transform", (2, 0)), ("enhance", manipulations),
+                          ("transform", (0, 1))])
+        self.assertTrue(os.path.isfile(self.path + ".vimiv"))
+        # The image itself is never modified
+        with Image.open(self.path) as im:
+            self.assertEqual(im.size, (30, 20))
+
+    def test_remove_identity(self):
+        """Remove the sidecar once all edits cancel each other out."""
+        editstack.push(self.path, ("transform", imageactions.flip(False)))
+        editstack.push(self.path, ("transform", imageactions.flip(False)))
+        self.assertFalse(editstack.has_edits(self.path))
+        editstack.push(self.path, ("enhance", {"bri": 1, "con": 1, "sha": 1}))
+        self.assertFalse(editstack.has_edits(self.path))
+
+    def test_invalid_sidecar(self):
+        """Ignore sidecars which cannot be read."""
+        with open(editstack.get_sidecar(self.path), "w") as f:
+            f.write("not json")
+        self.assertEqual(editstack.load(self.path), [])
+
+    def test_move(self):
+        """Move the sidecar with its image."""
+        editstack.push(self.path, ("transform", imageactions.rotation(1)))
+        dest = os.path.join(self.directory, "moved.png")
+        editstack.move(self.path, dest)
+        os.rename(self.path, dest)
+        self.assertEqual(editstack.load(dest), [("transform", (1, 0))])
+        self.assertFalse(editstack.has_edits(self.path))
+
+    def test_apply_to_pixbuf(self):
+        """Apply edits to a pixbuf."""
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file(self.path)
+        operations = [("transform", (1, 0)),
+                      ("enhance", {"bri": 0.5, "con": 1, "sha": 1})]
+        edited = editstack.apply_to_pixbuf(pixbuf, operations)
+        self.assertEqual((edited.get_width(), edited.get_height()), (20, 30))
+        im = editstack.image_from_pixbuf(edited)
+        self.assertEqual(im.getpixel((0, 0)), (50, 75, 100))
+
+    def test_export(self):
+        """Write edits into the image file."""
+        operations = [("transform", (1, 0)),
+                      ("enhance", {"bri": 0.5, "con": 1, "sha": 1})]
+        imageactions.export_file(self.path, operations)
+        with Image.open(self.path) as im:
+            self.assertEqual(im.size, (20, 30))
+            self.assertEqual(im.getpixel((0, 0)), (50, 75, 100))
+        # Only transformations
+        imageactions.export_file(self.path, [("transform", (3, 0))])
+        with Image.open(self.path) as im:
+            self.assertEqual(im.size, (30, 20))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+if __name__ == "__main__":
+    main()
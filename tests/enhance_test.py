@@ -0,0 +1,76 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test enhance.py for vimiv's test suite."""
+
+from unittest import TestCase, main
+
+from PIL import Image, ImageChops, ImageEnhance
+from vimiv import enhance
+
+
+def enhance_with_pil(im, manipulations):
+    """Apply the manipulations chaining ImageEnhance like vimiv used to."""
+    im = ImageEnhance.Brightness(im).enhance(manipulations["bri"])
+    im = ImageEnhance.Contrast(im).enhance(manipulations["con"])
+    return ImageEnhance.Sharpness(im).enhance(manipulations["sha"])
+
+
+class EnhanceTest(TestCase):
+    """Enhance Tests."""
+
+    def setUp(self):
+        self.image = Image.new("RGB", (64, 48))
+        self.image.putdata([(4 * x, 5 * y, 2 * (x + y))
+                            for y in range(48) for x in range(64)])
+
+    def assertSimilar(self, im1, im2):
+        """Fail if two images differ by more than rounding."""
+        difference = ImageChops.difference(im1, im2)
+        self.assertLessEqual(max(high for _, high in difference.getextrema()),
+                             2)
+
+    def test_enhance(self):
+        """Apply brightness, contrast and sharpness in two passes."""
+        for manipulations in [{"bri": 1.3, "con": 1, "sha": 1},
+                              {"bri": 1, "con": 0.6, "sha": 1},
+                              {"bri": 1, "con": 1, "sha": 1.8},
+                              {"bri": 0.8, "con": 1.4, "sha": 0.3}]:
+            self.assertSimilar(enhance.enhance(self.image, manipulations),
+                               enhance_with_pil(self.image, manipulations))
+
+    def test_unchanged(self):
+        """Return the image itself if nothing is changed."""
+        manipulations = {"bri": 1, "con": 1, "sha": 1}
+        self.assertIs(enhance.enhance(self.image, manipulations), self.image)
+
+    def test_enhance_strips(self):
+        """Process large images in overlapping strips."""
+        strip_pixels = enhance.STRIP_PIXELS
+        enhance.STRIP_PIXELS = 64 * 16
+        manipulations = {"bri": 0.8, "con": 1.4, "sha": 1.8}
+        for image in [self.image, self.image.convert("L"),
+                      self.image.convert("RGBA")]:
+            expected = enhance.enhance(enhance.prepare(image), manipulations)
+            result = enhance.enhance_strips(image, manipulations)
+            self.assertEqual(result.mode, expected.mode)
+            self.assertEqual(result.tobytes(), expected.tobytes())
+        enhance.STRIP_PIXELS = strip_pixels
+
+    def test_prepare(self):
+        """Convert images to RGB or RGBA."""
+        self.assertIs(enhance.prepare(self.image), self.image)
+        self.assertEqual(enhance.prepare(self.image.convert("L")).mode, "RGB")
+        self.assertEqual(enhance.prepare(self.image.convert("LA")).mode,
+                         "RGBA")
+
+    def test_keep_transparency(self):
+        """Do not change the alpha channel."""
+        image = self.image.convert("RGBA")
+        image.putalpha(128)
+        manipulations = {"bri": 1.5, "con": 0.5, "sha": 2}
+        enhanced = enhance.enhance(image, manipulations)
+        self.assertEqual(enhanced.mode, "RGBA")
+        self.assertEqual(enhanced.split()[-1].getextrema(), (128, 128))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test exif.py for vimiv's test suite."""
+
+import os
+import shutil
+import struct
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from vimiv import exif
+
+
+def create_jpeg(path, orientation, date):
+    """Write a JPEG header containing an APP1 segment with exif data."""
+    date = date.encode() + b"\x00"
+    # Orientation and pointer to the exif IFD in IFD0, date in the exif IFD
+    ifd0 = struct.pack("<H", 2)
+    ifd0 += struct.pack("<HHIHH", exif.ORIENTATION, 3, 1, orientation, 0)
+    ifd0 += struct.pack("<HHII", exif.EXIF_IFD_POINTER, 4, 1, 38)
+    ifd0 += struct.pack("<I", 0)
+    exif_ifd = struct.pack("<H", 1)
+    exif_ifd += struct.pack("<HHII", exif.DATETIME_ORIGINAL, 2, len(date), 56)
+    exif_ifd += struct.pack("<I", 0)
+    tiff = b"II*\x00" + struct.pack("<I", 8) + ifd0 + exif_ifd + date
+    segment = b"Exif\x00\x00" + tiff
+    with open(path, "wb") as f:
+        f.write(b"\xff\xd8\xff\xe1" + struct.pack(">H", len(segment) + 2))
+        f.write(segment)
+        f.write(b"\xff\xd9")
+
+
+class ExifTest(TestCase):
+    """Exif Tests."""
+
+    def setUp(self):
+        self.directory = mkdtemp()
+        self.path = os.path.join(self.directory, "image.jpg")
+        create_jpeg(self.path, 6, "2017:01:02 03:04:05")
+
+    def test_read_exif(self):
+        """Read orientation and date from the APP1 segment."""
+        data = exif.read_exif(self.path)
+        self.assertEqual(data.tags[exif.ORIENTATION], 6)
+        self.assertEqual(data.tags[exif.DATETIME_ORIGINAL],
+                         "2017:01:02 03:04:05")
+        self.assertEqual(data.byte_order, "<")
+        # The offset points to the orientation value in the file
+        with open(self.path, "rb") as f:
+            f.seek(data.orientation_offset)
+            self.assertEqual(struct.unpack("<H", f.read(2))[0], 6)
+
+    def test_no_exif(self):
+        """Return empty exif data for files without exif information."""
+        path = os.path.join(self.directory, "text")
+        with open(path, "w") as f:
+            f.write("no image")
+        self.assertEqual(exif.read_exif(path), exif.EMPTY)
+        self.assertEqual(exif.get_tags("not_a_file"), {})
+
+    def test_cache(self):
+        """Read the exif data again only if the file changed."""
+        self.assertEqual(exif.get_tags(self.path)[exif.ORIENTATION], 6)
+        create_jpeg(self.path, 3, "2017:01:02 03:04:05")
+        stat_result = os.stat(self.path)
+        os.utime(self.path, ns=(stat_result.st_atime_ns,
+                                stat_result.st_mtime_ns + 10**9))
+        self.assertEqual(exif.get_tags(self.path)[exif.ORIENTATION], 3)
+
+    def test_get_exif_many(self):
+        """Read the exif data of many files in parallel."""
+        paths = [self.path, "not_a_file"]
+        result = exif.get_exif_many(paths)
+        self.assertEqual(result[self.path].tags[exif.ORIENTATION], 6)
+        self.assertEqual(result["not_a_file"], exif.EMPTY)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+if __name__ == "__main__":
+    main()
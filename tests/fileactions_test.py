@@ -110,6 +110,21 @@ class FileActionsTest(VimivTestCase):
         message = self.vimiv["statusbar"].left_label.get_text()
         self.assertIn("No exif data for", message)
 
+    def test_sort(self):
+        """Sort the filelist in place keeping the current image focused."""
+        os.chdir("testimages/")
+        self.vimiv.paths = [os.path.abspath(path)
+                            for path in ["arch-logo.png", "arch_001.jpg"]]
+        paths = self.vimiv.paths
+        expected_paths = sorted(paths, key=os.path.getsize)
+        self.vimiv.index = 1
+        self.vimiv["fileextras"].sort("size")
+        self.assertIs(self.vimiv.paths, paths)
+        self.assertEqual(self.vimiv.paths, expected_paths)
+        self.assertEqual(self.vimiv.paths[self.vimiv.index],
+                         os.path.abspath("arch_001.jpg"))
+        self.vimiv["fileextras"].sort("natural")
+
     def test_clipboard(self):
         """Copy image name to clipboard."""
         def compare_text(clipboard, text, expected_text):
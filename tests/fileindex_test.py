@@ -0,0 +1,47 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test fileindex.py for vimiv's test suite."""
+
+import os
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from vimiv.fileindex import FileIndex, FileRecord
+
+
+class FileIndexTest(TestCase):
+    """FileIndex Tests."""
+
+    def setUp(self):
+        self.directory = mkdtemp()
+        self.index = FileIndex(os.path.join(self.directory, "fileindex.db"))
+
+    def test_directory(self):
+        """Store and revalidate the content of a directory."""
+        record = FileRecord("/images/a.jpg", 42, 1024, 300, 200, "jpeg")
+        self.index.set_directory("/images", 1, ["/images/sub"], [record])
+        self.assertEqual(self.index.get_directory("/images", 1),
+                         (["/images/sub"], ["/images/a.jpg"]))
+        self.assertEqual(self.index.lookup("/images/a.jpg"), record)
+        # Directory changed
+        self.assertIsNone(self.index.get_directory("/images", 2))
+        self.assertIsNone(self.index.get_directory("/unknown", 1))
+        # Replace the content
+        self.index.set_directory("/images", 2, [], [])
+        self.assertEqual(self.index.get_directory("/images", 2), ([], []))
+        self.assertIsNone(self.index.lookup("/images/a.jpg"))
+
+    def test_persistent(self):
+        """Keep the index when opening the database again."""
+        self.index.set_directory("/images", 1, [], [])
+        self.index.close()
+        self.index = FileIndex(os.path.join(self.directory, "fileindex.db"))
+        self.assertEqual(self.index.get_directory("/images", 1), ([], []))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+
+if __name__ == "__main__":
+    main()
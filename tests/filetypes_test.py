@@ -0,0 +1,63 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test filetypes.py for vimiv's test suite."""
+
+import os
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+import vimiv.filetypes as filetypes
+
+
+class FileTypesTest(TestCase):
+    """Filetypes Tests."""
+
+    def setUp(self):
+        self.directory = mkdtemp()
+
+    def create_file(self, name, content):
+        """Create a file called name in the test directory."""
+        filename = os.path.join(self.directory, name)
+        with open(filename, "wb") as f:
+            f.write(content)
+        return filename
+
+    def test_sniff(self):
+        """Find the format from magic bytes."""
+        self.assertEqual(filetypes.sniff(b"\xff\xd8\xff\xe0"), "jpeg")
+        self.assertEqual(filetypes.sniff(b"\x89PNG\r\n\x1a\n"), "png")
+        self.assertEqual(filetypes.sniff(b"RIFF\x00\x00\x00\x00WEBP"), "webp")
+        self.assertIsNone(filetypes.sniff(b"vimiv"))
+
+    def test_is_image(self):
+        """Check whether files are images."""
+        jpg = self.create_file("image.jpg", b"\xff\xd8\xff\xe0")
+        self.assertTrue(filetypes.is_image(jpg))
+        # Extension claims an image, content does not
+        not_jpg = self.create_file("not_an_image.jpg", b"vimiv")
+        self.assertFalse(filetypes.is_image(not_jpg))
+        # No extension at all
+        png = self.create_file("image", b"\x89PNG\r\n\x1a\n")
+        self.assertTrue(filetypes.is_image(png))
+        # Never an image
+        text = self.create_file("text.txt", b"\x89PNG\r\n\x1a\n")
+        self.assertFalse(filetypes.is_image(text))
+        self.assertFalse(filetypes.is_image(self.directory))
+        self.assertFalse(filetypes.is_image("not_a_file"))
+
+    def test_cache(self):
+        """Revalidate cached results when the file changes."""
+        filename = self.create_file("image", b"vimiv")
+        self.assertFalse(filetypes.is_image(filename))
+        self.create_file("image", b"\xff\xd8\xff\xe0")
+        # Make sure the modification time differs
+        stat = os.stat(filename)
+        os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertTrue(filetypes.is_image(filename))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+if __name__ == "__main__":
+    main()
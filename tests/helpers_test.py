@@ -24,6 +24,42 @@ class HelpersTest(TestCase):
         self.assertEqual(len(hidden_files), 2)
         self.assertEqual(hidden_files, sorted(hidden_files))
 
+    def test_path_list(self):
+        """Look up positions in a PathList."""
+        paths = helpers.PathList(["a", "b", "c"])
+        self.assertEqual(paths.index("c"), 2)
+        self.assertIn("b", paths)
+        self.assertNotIn("d", paths)
+        with self.assertRaises(ValueError):
+            paths.index("d")
+        # Positions are updated after modifications
+        paths.append("d")
+        self.assertEqual(paths.index("d"), 3)
+        del paths[0]
+        self.assertEqual(paths.index("b"), 0)
+        paths.insert(0, "e")
+        self.assertEqual(paths.index("b"), 1)
+        paths.reverse()
+        self.assertEqual(paths.index("e"), 3)
+        paths[0] = "f"
+        self.assertNotIn("d", paths)
+        self.assertEqual(paths, ["f", "c", "b", "e"])
+
+    def test_ordered_set(self):
+        """Add and remove items of an OrderedSet."""
+        items = helpers.OrderedSet(["b", "a"])
+        items.add("c")
+        items.add("a")
+        self.assertEqual(items, ["b", "a", "c"])
+        self.assertIn("a", items)
+        self.assertEqual(items[-2], "a")
+        items.remove("a")
+        self.assertNotIn("a", items)
+        self.assertEqual(items, ["b", "c"])
+        self.assertEqual(items.pop(), "c")
+        items.clear()
+        self.assertEqual(items, [])
+
     def test_read_file(self):
         """Check if a file is read correctly into a list of its lines."""
         helpers.read_file("tmp_testdir/bar")
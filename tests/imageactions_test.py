@@ -8,8 +8,20 @@ from unittest import TestCase, main
 
 import vimiv.imageactions as imageactions
 from PIL import Image
+from gi import require_version
+require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf
 
-from vimiv_testcase import compare_images
+
+def get_shown_image(path):
+    """Return size and pixels of an image as it is shown by vimiv."""
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file(path).apply_embedded_orientation()
+    return pixbuf.get_width(), pixbuf.get_height(), pixbuf.get_pixels()
+
+
+def compare_images(file1, file2):
+    """Compare two images as they are shown by vimiv."""
+    return get_shown_image(file1) == get_shown_image(file2)
 
 
 class ImageActionsTest(TestCase):
@@ -34,11 +46,11 @@ class ImageActionsTest(TestCase):
             Args:
                 rotate_int: Number defining the rotation.
             """
-            with Image.open(self.filename) as im:
-                orientation_before = im.size[0] < im.size[1]
+            width, height, _ = get_shown_image(self.filename)
+            orientation_before = width < height
             imageactions.rotate_file(self.files, rotate_int)
-            with Image.open(self.filename) as im:
-                orientation_after = im.size[0] < im.size[1]
+            width, height, _ = get_shown_image(self.filename)
+            orientation_after = width < height
             if rotate_int in [1, 3]:
                 self.assertNotEqual(orientation_before, orientation_after)
             elif rotate_int == 2:
@@ -74,6 +86,70 @@ class ImageActionsTest(TestCase):
         imageactions.flip_file(self.files, True)
         self.assertTrue(compare_images(self.orig, self.filename))
 
+    def test_compose(self):
+        """Compose rotations and flips."""
+        rotate_left = imageactions.rotation(1)
+        rotate_right = imageactions.rotation(-1)
+        self.assertEqual(imageactions.compose(rotate_left, rotate_right),
+                         imageactions.IDENTITY)
+        flip_h = imageactions.flip(True)
+        flip_v = imageactions.flip(False)
+        self.assertEqual(imageactions.compose(flip_h, flip_h),
+                         imageactions.IDENTITY)
+        self.assertEqual(imageactions.compose(flip_h, flip_v),
+                         imageactions.rotation(2))
+        # Flipping and rotating left equals rotating right and flipping
+        self.assertEqual(imageactions.compose(flip_h, rotate_left),
+                         imageactions.compose(rotate_right, flip_h))
+        # Every orientation tag describes a different transformation
+        self.assertEqual(len(imageactions.ORIENTATION_TAGS), 8)
+
+    def test_transform_methods(self):
+        """Rotate files changing the orientation tag or the pixels."""
+        for method in ["exif", "PIL"]:
+            shutil.copyfile(self.orig, self.filename)
+            width, height, _ = get_shown_image(self.filename)
+            used = imageactions.transform_file(
+                self.filename, imageactions.rotation(1), method)
+            self.assertEqual(used, method)
+            self.assertEqual(get_shown_image(self.filename)[:2],
+                             (height, width))
+        # Nothing to do
+        self.assertIsNone(imageactions.transform_file(
+            self.filename, imageactions.IDENTITY))
+
+    def test_save_image(self):
+        """Replace images at once keeping symbolic links and permissions."""
+        link = os.path.join(self.thumbdir, "link.jpg")
+        os.symlink(self.filename, link)
+        os.chmod(self.filename, 0o640)
+        width, height, _ = get_shown_image(self.filename)
+        imageactions.transform_file(link, imageactions.rotation(1), "PIL")
+        self.assertEqual(get_shown_image(self.filename)[:2], (height, width))
+        self.assertTrue(os.path.islink(link))
+        self.assertEqual(os.stat(self.filename).st_mode & 0o777, 0o640)
+        # No temporary file is left behind
+        self.assertFalse([name for name in os.listdir()
+                          if name.startswith(".image_to_edit")])
+
+    def test_enhance_mode(self):
+        """Keep the mode of enhanced images where this loses nothing."""
+        manipulations = {"bri": 1.5, "con": 1, "sha": 1}
+        path = os.path.join(self.thumbdir, "image.png")
+        palette = Image.new("P", (30, 20), 1)
+        palette.putpalette([value for value in range(256) for _ in "RGB"])
+        for im, kwargs, mode, pixel in [
+                (Image.new("L", (30, 20), 100), {}, "L", 150),
+                (Image.new("I;16", (30, 20), 25700), {}, "I;16", 38550),
+                (palette, {"transparency": 1}, "RGBA", (2, 2, 2, 0))]:
+            im.save(path, **kwargs)
+            imageactions.enhance_file(path, manipulations)
+            with Image.open(path) as enhanced:
+                self.assertEqual(enhanced.mode, mode)
+                self.assertEqual(enhanced.getpixel((0, 0)), pixel)
+                # The transparent palette index does not apply anymore
+                self.assertNotIn("transparency", enhanced.info)
+
     def test_autorotate(self):
         """Autorotate files."""
         # Method jhead
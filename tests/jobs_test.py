@@ -0,0 +1,122 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test jobs.py for vimiv's test suite."""
+
+import os
+from unittest import main
+
+from vimiv_testcase import VimivTestCase, refresh_gui
+
+
+class JobsTest(VimivTestCase):
+    """Job Runner Tests."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.init_test(cls, ["vimiv/testimages/arch_001.jpg"])
+        cls.jobs = cls.vimiv["jobs"]
+
+    def wait_for_jobs(self):
+        """Run the main loop until all jobs are done."""
+        while self.jobs.is_running():
+            refresh_gui(0.05)
+
+    def test_run(self):
+        """Run jobs in worker processes and report errors."""
+        finished = []
+        self.jobs.run(os.path.getsize,
+                      [(os.path.abspath("arch_001.jpg"), ()),
+                       (os.path.abspath("not_a_file"), ())],
+                      "Testing", callback=finished.append)
+        self.assertIn("Testing", self.jobs.get_progress())
+        self.wait_for_jobs()
+        batch = finished[0]
+        self.assertEqual(list(batch.results), [os.path.abspath("arch_001.jpg")])
+        self.assertEqual(batch.errors[0][0], os.path.abspath("not_a_file"))
+        self.check_statusbar(
+            "ERROR: Testing failed for 1 image(s): not_a_file")
+        self.assertEqual(self.jobs.get_progress(), "")
+
+    def test_pool_error(self):
+        """Report jobs which fail outside of the worker function."""
+        finished = []
+        path = os.path.abspath("arch_001.jpg")
+        # Lambdas cannot be pickled to be sent to the worker
+        self.jobs.run(os.path.getsize, [(path, (lambda: None,))], "Testing",
+                      callback=finished.append)
+        self.wait_for_jobs()
+        self.assertEqual(finished[0].errors[0][0], path)
+        self.assertFalse(self.jobs.has_jobs(path))
+        self.assertEqual(self.jobs.running, 0)
+
+    def test_merge(self):
+        """Merge waiting jobs of the same file."""
+        finished = []
+        self.jobs.max_running = 1
+        first = os.path.abspath("arch_001.jpg")
+        second = os.path.abspath("arch-logo.png")
+        self.jobs.run(os.path.getsize, [(first, ()), (second, ())],
+                      "Testing", callback=finished.append)
+        self.jobs.run(os.path.getsize, [(second, ())], "Testing",
+                      callback=finished.append,
+                      merge=lambda waiting, new: waiting)
+        # The second file is only processed once for both batches
+        self.assertEqual(len(self.jobs.queue), 1)
+        self.wait_for_jobs()
+        self.assertEqual(len(finished), 2)
+        self.assertIn(second, finished[1].results)
+        # Without a merge function every job is run
+        results = []
+
+        def on_file(path, result):
+            results.append(result)
+        self.jobs.run(os.path.getsize, [(first, ())], "Testing")
+        for _ in range(2):
+            self.jobs.run(os.path.getsize, [(second, ())], "Testing",
+                          on_file=on_file)
+        self.assertEqual(len(self.jobs.queue), 2)
+        self.wait_for_jobs()
+        self.assertEqual(len(results), 2)
+        self.jobs.max_running = 2 * self.jobs._processes
+
+    def test_order(self):
+        """Run the jobs of a file in the order they were started."""
+        results = []
+        self.jobs.max_running = 1
+        first = os.path.abspath("arch_001.jpg")
+        second = os.path.abspath("arch-logo.png")
+
+        def on_file(path, result):
+            results.append(result)
+        self.jobs.run(os.path.getsize, [(first, ())], "Testing")
+        self.jobs.run(os.path.getsize, [(second, ())], "Testing",
+                      on_file=on_file)
+        self.jobs.run(os.path.isfile, [(second, ())], "Testing",
+                      on_file=on_file)
+        # Merging into the first job of second would run it too early
+        self.jobs.run(os.path.getsize, [(second, ())], "Testing",
+                      on_file=on_file, merge=lambda waiting, new: waiting)
+        self.assertEqual(len(self.jobs.queue), 3)
+        self.wait_for_jobs()
+        size = os.path.getsize(second)
+        self.assertEqual(results, [size, True, size])
+        self.jobs.max_running = 2 * self.jobs._processes
+
+    def test_cancel(self):
+        """Cancel jobs which were not started yet."""
+        finished = []
+        self.jobs.max_running = 1
+        # Jobs of one file are run one after another
+        paths = [os.path.abspath("arch_001.jpg")] + \
+            [os.path.abspath("not_a_file_%d" % i) for i in range(4)]
+        self.jobs.run(os.path.getsize, [(path, ()) for path in paths],
+                      "Testing", callback=finished.append)
+        self.jobs.cancel()
+        self.wait_for_jobs()
+        errors = finished[0].errors
+        self.assertTrue(errors)
+        self.assertEqual({error for _, error in errors}, {"Cancelled"})
+        self.jobs.max_running = 2 * self.jobs._processes
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test journal.py for vimiv's test suite."""
+
+import os
+import shutil
+from tempfile import mkdtemp
+from unittest import main
+
+from PIL import Image
+
+from vimiv import editstack
+from vimiv.fileactions import move_to_trash
+from vimiv.journal import Journal
+from vimiv_testcase import VimivTestCase, compare_images, refresh_gui
+
+
+class JournalTest(VimivTestCase):
+    """Journal Tests."""
+
+    @classmethod
+    def setUpClass(cls):
+        if os.path.isdir("vimiv/testimages_journal"):
+            shutil.rmtree("vimiv/testimages_journal")
+        shutil.copytree("vimiv/testimages", "vimiv/testimages_journal")
+        cls.init_test(cls, ["vimiv/testimages_journal/arch-logo.png"])
+        cls.journal = cls.vimiv["journal"]
+        cls.manipulate = cls.vimiv["manipulate"]
+
+    def setUp(self):
+        self.path = self.vimiv.paths[self.vimiv.index]
+
+    def wait_for_jobs(self):
+        """Run the main loop until all jobs are done."""
+        while self.vimiv["jobs"].is_running():
+            refresh_gui(0.05)
+
+    def get_size(self):
+        with Image.open(self.path) as im:
+            return im.size
+
+    def test_undo_rotate(self):
+        """Undo and redo rotating a file."""
+        size = self.get_size()
+        self.manipulate.rotate(1)
+        self.journal.undo()
+        self.wait_for_jobs()
+        self.assertEqual(self.get_size(), size)
+        self.check_statusbar("INFO: Undid rotate and flip of 1 file(s)")
+        self.journal.redo()
+        self.wait_for_jobs()
+        self.assertEqual(self.get_size(), size[::-1])
+        self.journal.undo()
+        self.wait_for_jobs()
+        # Nothing left to redo after a new operation
+        self.manipulate.flip(1)
+        self.manipulate.run_simple_manipulations()
+        self.journal.redo()
+        self.check_statusbar("INFO: Nothing to redo")
+        self.journal.undo()
+        self.wait_for_jobs()
+
+    def test_undo_enhance(self):
+        """Restore an enhanced file from its backup."""
+        shutil.copyfile(self.path, "backup.png")
+        self.manipulate.toggle()
+        self.manipulate.manipulations = {"bri": 1.5, "con": 1, "sha": 1}
+        self.manipulate.button_clicked(None, True)
+        self.wait_for_jobs()
+        self.assertFalse(compare_images("backup.png", self.path))
+        self.journal.undo()
+        self.wait_for_jobs()
+        self.assertTrue(compare_images("backup.png", self.path))
+        os.remove("backup.png")
+
+    def test_undo_stack(self):
+        """Undo non-destructive edits."""
+        self.manipulate.non_destructive = True
+        self.manipulate.rotate(1)
+        self.manipulate.run_simple_manipulations()
+        self.assertEqual(editstack.load(self.path), [("transform", (1, 0))])
+        self.journal.undo()
+        self.assertFalse(editstack.has_edits(self.path))
+        self.manipulate.non_destructive = False
+
+    def test_undo_delete(self):
+        """Move deleted files back."""
+        directory = mkdtemp()
+        path = os.path.join(directory, "to_delete.png")
+        shutil.copyfile(self.path, path)
+        moved = []
+        move_to_trash([path], self.vimiv["image"].trashdir, moved)
+        self.journal.record("delete", [("move", src, dest)
+                                       for src, dest in moved])
+        self.assertFalse(os.path.exists(path))
+        self.journal.undo()
+        self.assertTrue(os.path.exists(path))
+        self.journal.redo()
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(moved[0][1]))
+        os.remove(moved[0][1])
+        shutil.rmtree(directory)
+
+    def test_undo_delete_same_name(self):
+        """Move deleted files back which had the same name in the trash."""
+        directories = [mkdtemp() for _ in range(3)]
+        trashdir = directories.pop()
+        paths = [os.path.join(directory, "to_delete.png")
+                 for directory in directories]
+        for i, path in enumerate(paths):
+            with open(path, "w") as f:
+                f.write(str(i))
+        moved = []
+        move_to_trash(paths, trashdir, moved)
+        self.journal.record("delete", [("move", src, dest)
+                                       for src, dest in moved])
+        self.assertEqual(len(os.listdir(trashdir)), 2)
+        self.journal.undo()
+        for i, path in enumerate(paths):
+            with open(path) as f:
+                self.assertEqual(f.read(), str(i))
+        self.assertFalse(os.listdir(trashdir))
+        self.journal.redo()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertEqual(len(os.listdir(trashdir)), 2)
+        for directory in directories + [trashdir]:
+            shutil.rmtree(directory)
+
+    def test_undo_rename_chain(self):
+        """Undo renaming files to the names of other renamed files."""
+        directory = mkdtemp()
+        paths = [os.path.join(directory, "%d.png" % (i)) for i in range(3)]
+        for i, path in enumerate(paths[:2]):
+            with open(path, "w") as f:
+                f.write(str(i))
+        # Rename 1 to 2 and 0 to 1
+        steps = [("move", paths[1], paths[2]), ("move", paths[0], paths[1])]
+        for _, src, dest in steps:
+            shutil.move(src, dest)
+        self.journal.record("format", steps)
+        self.journal.undo()
+        for i, path in enumerate(paths[:2]):
+            with open(path) as f:
+                self.assertEqual(f.read(), str(i))
+        self.assertFalse(os.path.exists(paths[2]))
+        self.journal.redo()
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(os.path.exists(paths[2]))
+        shutil.rmtree(directory)
+
+    def test_budget(self):
+        """Drop the history if backups do not fit into the budget."""
+        self.manipulate.rotate(1)
+        self.manipulate.run_simple_manipulations()
+        self.wait_for_jobs()
+        budget = self.journal.budget
+        self.journal.budget = 0
+        self.assertIsNone(self.journal.get_backups([self.path]))
+        self.assertFalse(self.journal.undo_stack)
+        self.journal.budget = budget
+        self.assertEqual(len(self.journal.get_backups([self.path])), 1)
+        self.assertEqual(self.journal.used, os.path.getsize(self.path))
+        # Images removed in the meantime are not backed up
+        self.assertEqual(self.journal.get_backups(["not_a_file"]), [None])
+        self.assertEqual(self.journal.used, os.path.getsize(self.path))
+        # Remove the backup which was never used
+        self.journal.close()
+        self.assertEqual(self.journal.used, 0)
+
+    def test_remove_leftovers(self):
+        """Remove backups of instances which did not quit cleanly."""
+        # Larger than the maximum process ID of linux
+        leftover = os.path.join(self.vimiv.directory, "journal-4194305-x")
+        running = os.path.join(self.vimiv.directory,
+                               "journal-%d-x" % (os.getpid()))
+        os.mkdir(leftover)
+        os.mkdir(running)
+        Journal(self.vimiv, self.vimiv.settings)
+        self.assertFalse(os.path.exists(leftover))
+        self.assertTrue(os.path.exists(running))
+        os.rmdir(running)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.vimiv.quit()
+        os.chdir(cls.working_directory)
+        if os.path.isdir("./vimiv/testimages_journal"):
+            shutil.rmtree("vimiv/testimages_journal")
+
+
+if __name__ == "__main__":
+    main()
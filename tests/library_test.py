@@ -8,7 +8,7 @@ from gi import require_version
 require_version("Gtk", "3.0")
 from gi.repository import Gtk
 
-from vimiv_testcase import VimivTestCase
+from vimiv_testcase import VimivTestCase, refresh_gui
 
 
 class LibraryTest(VimivTestCase):
@@ -196,6 +196,24 @@ class LibraryTest(VimivTestCase):
         self.assertNotIn(sym, self.lib.files)
         os.remove(sym)
 
+    def test_count_images(self):
+        """Count images of subdirectories in the background."""
+        self.lib.reload(".")
+        index = self.lib.files.index("directory")
+        model = self.lib.treeview.get_model()
+        self.assertEqual(model[index][2], self.lib.count_placeholder)
+        self.lib._thread_pool.apply(lambda: None)  # Wait for the worker
+        refresh_gui()
+        self.assertNotEqual(model[index][2], self.lib.count_placeholder)
+        self.assertEqual(model[index][2], self.lib.filesize["directory"])
+        # Results of an old listing are dropped
+        self.lib._on_images_counted("directory", "42", self.lib.generation - 1)
+        self.assertNotEqual(model[index][2], "42")
+        # Directories removed in the meantime get a fallback value
+        self.assertEqual(
+            self.lib._count_images("not_a_directory", self.lib.generation),
+            ("not_a_directory", "N/A", self.lib.generation))
+
     def test_move_up(self):
         """Move up into directory."""
         before = os.getcwd()
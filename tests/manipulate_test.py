@@ -3,12 +3,11 @@
 
 import os
 import shutil
-from time import sleep
 from unittest import main
 
 from PIL import Image
 
-from vimiv_testcase import VimivTestCase, compare_images
+from vimiv_testcase import VimivTestCase, compare_images, refresh_gui
 
 
 class ManipulateTest(VimivTestCase):
@@ -22,6 +21,11 @@ class ManipulateTest(VimivTestCase):
         cls.init_test(cls, ["vimiv/testimages_man/arch-logo.png"])
         cls.manipulate = cls.vimiv["manipulate"]
 
+    def wait_for_jobs(self):
+        """Run the main loop until all jobs are done."""
+        while self.vimiv["jobs"].is_running():
+            refresh_gui(0.05)
+
     def test_get_manipulated_images(self):
         """Get images to manipulate."""
         # Nothing marked -> current image
@@ -61,9 +65,8 @@ class ManipulateTest(VimivTestCase):
             self.assertFalse(im.width < im.height)
         self.assertIn(self.vimiv.paths[self.vimiv.index],
                       self.manipulate.simple_manipulations.keys())
-        self.manipulate.thread_for_simple_manipulations()
-        while self.manipulate.simple_manipulations.keys():
-            sleep(0.05)
+        self.manipulate.run_simple_manipulations()
+        self.wait_for_jobs()
         with Image.open(self.vimiv.paths[self.vimiv.index]) as im:
             self.assertTrue(im.width < im.height)
         # Rotate back
@@ -74,9 +77,8 @@ class ManipulateTest(VimivTestCase):
         # Rotate the file
         self.assertIn(self.vimiv.paths[self.vimiv.index],
                       self.manipulate.simple_manipulations.keys())
-        self.manipulate.thread_for_simple_manipulations()
-        while self.manipulate.simple_manipulations.keys():
-            sleep(0.05)
+        self.manipulate.run_simple_manipulations()
+        self.wait_for_jobs()
         with Image.open(self.vimiv.paths[self.vimiv.index]) as im:
             self.assertFalse(im.width < im.height)
         # Fail because of no paths
@@ -135,6 +137,22 @@ class ManipulateTest(VimivTestCase):
         self.run_command("flip value")
         self.check_statusbar("ERROR: Argument for flip must be of type integer")
 
+    def test_compose_simple_manipulations(self):
+        """Compose rotations and flips into one transformation per file."""
+        path = self.vimiv.paths[self.vimiv.index]
+        self.manipulate.rotate(1, True)
+        self.manipulate.flip(1, True)
+        self.manipulate.rotate(1, True)
+        self.manipulate.flip(1, True)
+        # Rotating a flipped image left equals rotating right and flipping
+        self.assertEqual(self.manipulate.simple_manipulations[path], (0, 0))
+        # The file is left untouched
+        mtime = os.path.getmtime(path)
+        self.manipulate.run_simple_manipulations()
+        self.wait_for_jobs()
+        self.assertEqual(os.path.getmtime(path), mtime)
+        self.assertFalse(self.manipulate.simple_manipulations)
+
     def test_toggle(self):
         """Toggle manipulate."""
         # Via function
@@ -168,9 +186,26 @@ class ManipulateTest(VimivTestCase):
         self.manipulate.toggle()
         self.manipulate.manipulations = {"bri": 20, "con": 20, "sha": 20}
         self.manipulate.button_clicked(None, True)
+        # The file is saved in the background
+        self.assertTrue(self.vimiv["jobs"].has_jobs(
+            self.vimiv.paths[self.vimiv.index]))
+        self.wait_for_jobs()
         self.assertFalse(compare_images(tmpfile,
                                         self.vimiv.paths[self.vimiv.index]))
 
+    def test_schedule_preview(self):
+        """Render the preview once for many slider changes."""
+        self.manipulate.toggle()
+        pixbuf = self.vimiv["image"].pixbuf_original
+        generation = self.manipulate.render_generation
+        for value in [10, 20, 30]:
+            self.manipulate.sliders["bri"].set_value(value)
+        while self.vimiv["image"].pixbuf_original is pixbuf:
+            refresh_gui(0.05)
+        self.assertEqual(self.manipulate.render_generation, generation + 1)
+        self.assertEqual(self.manipulate.manipulations["bri"], 157 / 127)
+        self.manipulate.button_clicked(None, False)
+
     def test_focus_sliders(self):
         """Focusing sliders in manipulate."""
         self.manipulate.toggle()
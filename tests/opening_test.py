@@ -4,7 +4,7 @@
 import os
 from unittest import main
 
-from vimiv_testcase import VimivTestCase
+from vimiv_testcase import VimivTestCase, refresh_gui
 
 
 class OpeningTest(VimivTestCase):
@@ -64,7 +64,26 @@ class OpeningTest(VimivTestCase):
         working_dir = self.working_directory
         os.chdir("vimiv/testimages")
         self.init_test(["."], ["GENERAL"], ["recursive"], [True])
+        # Images are added in the background
+        while self.vimiv["pathstream"].running:
+            refresh_gui(0.01)
         self.assertEqual(8, len(self.vimiv.paths))
+        self.assertEqual(sorted(self.vimiv.paths), self.vimiv.paths)
+        self.working_directory = working_dir
+
+    def test_opening_from_pipe(self):
+        """Open images from a pipe keeping their order."""
+        working_dir = self.working_directory
+        os.chdir("vimiv/testimages")
+        self.init_test()
+        lines = ["arch_001.jpg\n", "not_an_image\n", "directory\n",
+                 "arch-logo.png\n", "\n"]
+        self.vimiv["pathstream"].feed(iter(lines))
+        while self.vimiv["pathstream"].running:
+            refresh_gui(0.01)
+        expected_images = [os.path.abspath(image)
+                           for image in ["arch_001.jpg", "arch-logo.png"]]
+        self.assertEqual(expected_images, self.vimiv.paths)
         self.working_directory = working_dir
 
     def tearDown(self):
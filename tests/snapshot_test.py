@@ -0,0 +1,94 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test snapshot.py for vimiv's test suite."""
+
+import os
+import shutil
+import time
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from gi.repository import GLib
+from vimiv.snapshot import DirectoryCache, DirectorySnapshot
+
+
+class SnapshotTest(TestCase):
+    """DirectorySnapshot Tests."""
+
+    def setUp(self):
+        self.directory = mkdtemp()
+        with open(os.path.join(self.directory, "image.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+        with open(os.path.join(self.directory, "text.txt"), "w") as f:
+            f.write("vimiv")
+        with open(os.path.join(self.directory, ".hidden.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+        os.mkdir(os.path.join(self.directory, "directory"))
+        os.symlink(os.path.join(self.directory, "image.png"),
+                   os.path.join(self.directory, "link.png"))
+        os.symlink(os.path.join(self.directory, "not_a_file"),
+                   os.path.join(self.directory, "broken_link"))
+
+    def test_snapshot(self):
+        """Gather information on all files in a directory."""
+        snapshot = DirectorySnapshot(self.directory)
+        self.assertEqual(snapshot.names,
+                         ["directory", "image.png", "link.png", "text.txt"])
+        self.assertNotIn("broken_link", snapshot)
+        self.assertTrue(snapshot["directory"].is_dir)
+        self.assertFalse(snapshot["directory"].is_image)
+        self.assertTrue(snapshot["image.png"].is_image)
+        self.assertEqual(snapshot["image.png"].size, 8)
+        self.assertFalse(snapshot["text.txt"].is_image)
+        link = snapshot["link.png"]
+        self.assertTrue(link.is_link)
+        self.assertTrue(link.is_image)
+        self.assertEqual(link.target,
+                         os.path.realpath(snapshot.get_path("image.png")))
+
+    def test_show_hidden(self):
+        """Include hidden files in the snapshot."""
+        snapshot = DirectorySnapshot(self.directory, show_hidden=True)
+        self.assertIn(".hidden.png", snapshot)
+
+    def test_cache(self):
+        """Reuse snapshots until the directory changes."""
+        changed = []
+        cache = DirectoryCache(changed.append, delay=10)
+        snapshot = cache.get(self.directory)
+        self.assertIs(cache.get(self.directory), snapshot)
+        self.assertIsNot(cache.get(self.directory, True), snapshot)
+        # The file monitor invalidates the snapshot
+        with open(os.path.join(self.directory, "text.txt"), "a") as f:
+            f.write("vimiv")
+        context = GLib.MainContext.default()
+        timeout = time.time() + 5
+        while not changed and time.time() < timeout:
+            context.iteration(False)
+        self.assertEqual(changed, [self.directory])
+        self.assertNotIn(self.directory, cache)
+        self.assertIsNot(cache.get(self.directory), snapshot)
+
+    def test_ignore(self):
+        """Invalidate snapshots without calling back for ignored files."""
+        changed = []
+        cache = DirectoryCache(changed.append, delay=10,
+                               ignore=lambda path: path.endswith(".txt"))
+        cache.get(self.directory)
+        with open(os.path.join(self.directory, "text.txt"), "a") as f:
+            f.write("vimiv")
+        context = GLib.MainContext.default()
+        timeout = time.time() + 1
+        while self.directory in cache and time.time() < timeout:
+            context.iteration(False)
+        self.assertNotIn(self.directory, cache)
+        timeout = time.time() + 0.2
+        while time.time() < timeout:
+            context.iteration(False)
+        self.assertEqual(changed, [])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test sorting.py for vimiv's test suite."""
+
+import os
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from vimiv import sorting
+
+
+class SortingTest(TestCase):
+    """Sorting Tests."""
+
+    def setUp(self):
+        self.directory = mkdtemp()
+        self.paths = []
+        for i, name in enumerate(["IMG_10.jpg", "IMG_2.jpg", "IMG_1.jpg"]):
+            path = os.path.join(self.directory, name)
+            with open(path, "wb") as f:
+                f.write(b"x" * (10 - i))
+            os.utime(path, (i, i))
+            self.paths.append(path)
+
+    def test_natural_sorted(self):
+        """Sort strings containing numbers naturally."""
+        self.assertEqual(
+            sorting.natural_sorted(["IMG_10", "IMG_2", "img_1", "IMG_1"]),
+            ["IMG_1", "IMG_2", "IMG_10", "img_1"])
+
+    def test_sort_paths(self):
+        """Sort paths with the different methods."""
+        self.assertEqual(sorting.sort_paths(self.paths, "natural"),
+                         [self.paths[2], self.paths[1], self.paths[0]])
+        self.assertEqual(sorting.sort_paths(self.paths, "mtime"), self.paths)
+        self.assertEqual(sorting.sort_paths(self.paths, "size"),
+                         [self.paths[2], self.paths[1], self.paths[0]])
+        # Without exif date the files are sorted naturally
+        self.assertEqual(sorting.sort_paths(self.paths, "exif"),
+                         [self.paths[2], self.paths[1], self.paths[0]])
+
+    def test_cache(self):
+        """Only compute the keys again after uncaching the path."""
+        self.assertEqual(sorting.sort_paths(self.paths, "mtime"), self.paths)
+        os.utime(self.paths[0], (42, 42))
+        self.assertEqual(sorting.sort_paths(self.paths, "mtime"), self.paths)
+        sorting.uncache(self.paths[0])
+        self.assertEqual(sorting.sort_paths(self.paths, "mtime")[-1],
+                         self.paths[0])
+
+    def test_set_method(self):
+        """Set the current sort method."""
+        self.assertTrue(sorting.set_method("size"))
+        self.assertEqual(sorting.get_method(), "size")
+        self.assertFalse(sorting.set_method("invalid"))
+        self.assertEqual(sorting.get_method(), "size")
+        sorting.set_method("natural")
+
+    def tearDown(self):
+        for path in self.paths:
+            sorting.uncache(path)
+        shutil.rmtree(self.directory)
+
+
+if __name__ == "__main__":
+    main()
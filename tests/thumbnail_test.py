@@ -69,6 +69,40 @@ class ThumbnailTest(VimivTestCase):
         name = self.thumb.liststore.get_value(new_liststore_iter, 1)
         self.assertEqual(name, "arch-logo [*]")
 
+    def test_visible_thumbnails(self):
+        """Only keep thumbnails of the visible range in memory."""
+        # Draw the iconview so the visible range is known
+        refresh_gui()
+        self.assertIn(0, self.thumb.get_visible_range())
+        self.thumb.update_visible()
+        visible = self.thumb.get_visible_range()
+        self.assertTrue(self.thumb.loaded)
+        self.assertEqual(self.thumb.loaded, set(visible))
+        # Positions outside of the range hold the placeholder
+        for position in range(len(self.vimiv.paths)):
+            if position not in visible:
+                pixbuf = self.thumb.liststore[position][0]
+                self.assertEqual(pixbuf, self.thumb.default_pixbuf)
+
+    def test_update_paths(self):
+        """Update thumbnails in place when paths changed."""
+        old_paths = list(self.vimiv.paths)
+        self.thumb.move_to_pos(2)
+        focused = self.vimiv.get_pos(True, "thu")
+        # Remove the first path
+        self.vimiv.paths = old_paths[1:]
+        self.thumb.update_paths(old_paths)
+        self.assertEqual(len(self.thumb.liststore), len(old_paths) - 1)
+        self.assertEqual(self.thumb.liststore[0][1], "arch_001")
+        # The focused image stays focused
+        self.assertEqual(self.vimiv.get_pos(True, "thu"), focused)
+        # And add it again
+        self.vimiv.paths = old_paths
+        self.thumb.update_paths(old_paths[1:])
+        self.assertEqual(len(self.thumb.liststore), len(old_paths))
+        self.assertEqual(self.thumb.liststore[0][1], "arch-logo")
+        self.assertEqual(self.vimiv.get_pos(True, "thu"), focused)
+
     def test_move(self):
         """Move in thumbnail mode."""
         # All items are in the same row
@@ -116,9 +150,12 @@ class ThumbnailTest(VimivTestCase):
             self.thumb.zoom(True)
         self.assertEqual(self.thumb.get_zoom_level(), (128, 128))
         # Zoom in and check thumbnail size and pixbuf
+        self.thumb.move_to_pos(1)
         self.thumb.zoom(True)
         refresh_gui()
         self.assertEqual(self.thumb.get_zoom_level(), (256, 256))
+        # The focused thumbnail stays focused
+        self.assertEqual(self.vimiv.get_pos(force_widget="thu"), 1)
         pixbuf = self.thumb.liststore[0][0]
         width = pixbuf.get_width()
         height = pixbuf.get_height()
@@ -0,0 +1,52 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Test watcher.py for vimiv's test suite."""
+
+import os
+import shutil
+from unittest import main
+
+from vimiv_testcase import VimivTestCase
+
+
+class WatcherTest(VimivTestCase):
+    """Watcher Tests."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.init_test(cls, ["vimiv/testimages/arch_001.jpg"],
+                      ["GENERAL"], ["watch"], [True])
+        cls.watcher = cls.vimiv["watcher"]
+
+    def test_watch_paths(self):
+        """Watch the directories of the current images."""
+        self.assertTrue(self.watcher.is_watched(os.getcwd()))
+        self.watcher.toggle()
+        self.assertFalse(self.watcher.is_watched(os.getcwd()))
+        self.watcher.toggle()
+        self.assertTrue(self.watcher.is_watched(os.getcwd()))
+
+    def test_add_pending(self):
+        """Append new images to the filelist."""
+        new_image = os.path.abspath("zz_watched.jpg")
+        shutil.copyfile("arch_001.jpg", new_image)
+        amount = len(self.vimiv.paths)
+        index = self.vimiv.index
+        self.watcher.pending.add(new_image)
+        self.watcher.pending.add(os.path.abspath("not_an_image"))
+        self.watcher.add_pending()
+        self.assertEqual(len(self.vimiv.paths), amount + 1)
+        self.assertEqual(self.vimiv.paths[-1], new_image)
+        self.assertEqual(self.vimiv.index, index)
+        # Follow the newest image
+        self.vimiv.paths.remove(new_image)
+        self.watcher.follow = True
+        self.watcher.pending.add(new_image)
+        self.watcher.add_pending()
+        self.assertEqual(self.vimiv.get_pos(True), new_image)
+        self.watcher.follow = False
+        os.remove(new_image)
+        self.vimiv.paths.remove(new_image)
+
+
+if __name__ == "__main__":
+    main()
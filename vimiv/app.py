@@ -14,16 +14,22 @@ from vimiv.completions import Completion
 from vimiv.configparser import parse_config, parse_dirs, set_defaults
 from vimiv.eventhandler import KeyHandler
 from vimiv.fileactions import FileExtras, populate
+from vimiv.helpers import PathList
 from vimiv.image import Image
 from vimiv.information import Information
+from vimiv.jobs import JobRunner
+from vimiv.journal import Journal
 from vimiv.library import Library
 from vimiv.log import Log
 from vimiv.manipulate import Manipulate
 from vimiv.mark import Mark
+from vimiv.pathstream import PathStream
+from vimiv.sorting import set_method
 from vimiv.slideshow import Slideshow
 from vimiv.statusbar import Statusbar
 from vimiv.tags import TagHandler
 from vimiv.thumbnail import Thumbnail
+from vimiv.watcher import Watcher
 from vimiv.window import Window
 
 
@@ -32,8 +38,11 @@ class Vimiv(Gtk.Application):
 
     Attributes:
         settings: Settings from configfiles to use.
-        paths: List of paths for images.
+        paths: PathList of paths for images.
         index: Current position in paths.
+        directories: Directories to search recursively for images once vimiv
+            is active.
+        stdin: Iterator over the lines of stdin if paths are piped to vimiv.
         widgets: Dictionary of vimiv widgets.
             widgets[widget-name] = Gtk.Widget
         debug: If True, write all messages and commands to log.
@@ -61,8 +70,10 @@ class Vimiv(Gtk.Application):
         self.set_flags(Gio.ApplicationFlags.HANDLES_OPEN)
         self.connect("activate", self.activate_vimiv)
         self.settings = {}
-        self.paths = []
+        self._paths = PathList()
         self.index = 0
+        self.directories = []
+        self.stdin = None
         self.widgets = {}
         self.debug = False
         self.directory = os.path.expanduser("~/.vimiv")
@@ -72,6 +83,16 @@ class Vimiv(Gtk.Application):
         # Set up all commandline options
         self.init_commandline_options()
 
+    @property
+    def paths(self):
+        """PathList of paths for images."""
+        return self._paths
+
+    @paths.setter
+    def paths(self, paths):
+        """Set the paths for images wrapping them in a PathList."""
+        self._paths = paths if isinstance(paths, PathList) else PathList(paths)
+
     # Any different number of arguments will fail
     # pylint: disable=arguments-differ
     def do_open(self, files, n_files, hint):
@@ -90,10 +111,13 @@ class Vimiv(Gtk.Application):
             working_directory = os.path.dirname(filenames[0])
         if os.path.exists(working_directory):
             os.chdir(working_directory)
-        # Populate list of images
-        recursive = self.settings["GENERAL"]["recursive"]
+        # Populate list of images, directories are searched recursively in
+        # the background once vimiv is active
+        if self.settings["GENERAL"]["recursive"]:
+            self.directories = [fil for fil in filenames if os.path.isdir(fil)]
+            filenames = [fil for fil in filenames if not os.path.isdir(fil)]
         shuffle = self.settings["GENERAL"]["shuffle"]
-        self.paths, self.index = populate(filenames, recursive, shuffle)
+        self.paths, self.index = populate(filenames, False, shuffle)
 
         # Activate vimiv after opening files
         self.activate_vimiv(self)
@@ -148,16 +172,13 @@ class Vimiv(Gtk.Application):
             self.settings = parse_config(running_tests=self.running_tests)
 
         # If we start from desktop, move to the wanted directory
-        # Else if the input does not come from a tty, e.g. find "" | vimiv, set
-        # paths and index according to the input from the pipe
+        # Else if the input does not come from a tty, e.g. find "" | vimiv,
+        # read paths from the pipe in the background once vimiv is active
         if options.contains("start-from-desktop"):
             os.chdir(self.settings["LIBRARY"]["desktop_start_dir"])
         elif not sys.stdin.isatty():
             try:
-                tty_paths = []
-                for line in sys.stdin:
-                    tty_paths.append(line.rstrip("\n"))
-                self.paths, self.index = populate(tty_paths)
+                self.stdin = iter(sys.stdin)
             except TypeError:
                 pass  # DebugConsoleStdIn is not iterable
 
@@ -171,9 +192,12 @@ class Vimiv(Gtk.Application):
         set_option("no-shuffle", "GENERAL", "shuffle", 0)
         set_option("recursive", "GENERAL", "recursive", 1)
         set_option("no-recursive", "GENERAL", "recursive", 0)
+        set_option("watch", "GENERAL", "watch", 1)
+        set_option("no-watch", "GENERAL", "watch", 0)
         set_option("slideshow", "GENERAL", "start_slideshow", 1)
         set_option("slideshow-delay", "GENERAL", "slideshow_delay", 2)
         set_option("geometry", "GENERAL", "geometry", 2)
+        set_method(self.settings["GENERAL"]["sort"])
 
         return -1  # To continue
 
@@ -198,9 +222,16 @@ class Vimiv(Gtk.Application):
         self["statusbar"].set_separator_height()
         # Try to generate imagelist recursively from the current directory if
         # recursive is given and not paths exist
-        if self.settings["GENERAL"]["recursive"] and not self.paths:
-            shuffle = self.settings["GENERAL"]["shuffle"]
-            self.paths, self.index = populate([os.getcwd()], True, shuffle)
+        if self.settings["GENERAL"]["recursive"] and not self.paths \
+                and not self.directories:
+            self.directories = [os.getcwd()]
+        if self.directories:
+            self["pathstream"].walk(self.directories)
+        elif self.stdin and not self.paths:
+            self["pathstream"].feed(self.stdin)
+        self.stdin = None
+        # Watch the directories for new images if requested
+        self["watcher"].watch_paths()
         # Show the image if an imagelist exists
         if self.paths:
             self["image"].load_image()
@@ -218,6 +249,16 @@ class Vimiv(Gtk.Application):
             if self["library"].expand:
                 self["image"].scrolled_win.hide()
 
+    def show_paths(self):
+        """Show the image at index once paths were added to an empty list."""
+        self["library"].scrollable_treeview.set_hexpand(False)
+        self["image"].scrolled_win.show()
+        self["image"].load_image()
+        if not self["library"].show_at_start:
+            self["library"].grid.hide()
+        self["image"].scrolled_win.grab_focus()
+        self["statusbar"].update_info()
+
     def init_widgets(self):
         """Create all the other widgets and add them to the class."""
         self["eventhandler"] = KeyHandler(self, self.settings)
@@ -231,6 +272,10 @@ class Vimiv(Gtk.Application):
         self["image"] = Image(self, self.settings)
         self["library"] = Library(self, self.settings)
         self["thumbnail"] = Thumbnail(self, self.settings)
+        self["watcher"] = Watcher(self, self.settings)
+        self["pathstream"] = PathStream(self)
+        self["jobs"] = JobRunner(self)
+        self["journal"] = Journal(self, self.settings)
         self["manipulate"] = Manipulate(self, self.settings)
         self["information"] = Information()
         self["window"] = Window(self, self.settings)
@@ -298,8 +343,12 @@ class Vimiv(Gtk.Application):
             return
         for image in self["mark"].marked:
             print(image)
-        # Run remaining rotate and flip threads
-        self["manipulate"].thread_for_simple_manipulations()
+        # Stop adding paths in the background
+        self["pathstream"].close()
+        # Run remaining rotations and flips and wait for all running jobs
+        self["manipulate"].run_simple_manipulations()
+        self["jobs"].close()
+        self["journal"].close()
         # Save the history
         histfile = os.path.join(self.directory, "history")
         histfile = open(histfile, "w")
@@ -385,6 +434,8 @@ class Vimiv(Gtk.Application):
         add_option("shuffle", "s", "Shuffle filelist")
         add_option("no-shuffle", "S", "Do not shuffle filelist")
         add_option("version", "v", "Print version information and exit")
+        add_option("watch", "w", "Watch directories for new images")
+        add_option("no-watch", "W", "Do not watch directories for new images")
         add_option("start-from-desktop", 0,
                    "Start using the desktop_start_dir as path")
         add_option("slideshow", 0, "Start slideshow at startup")
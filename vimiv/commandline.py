@@ -461,7 +461,7 @@ class CommandLine(object):
 
         # Fill search_positions with matching files depending on search_case
         self.search_positions = \
-            [paths.index(fil) for fil in paths
+            [i for i, fil in enumerate(paths)
              if searchstr in fil
              or not self.search_case and searchstr.lower() in fil.lower()]
 
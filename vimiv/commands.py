@@ -29,6 +29,7 @@ class Commands(object):
         self.add_command("alias", self.app["commandline"].alias,
                          positional_args=["name", "command"])
         self.add_command("autorotate", self.app["manipulate"].rotate_auto)
+        self.add_command("cancel_jobs", self.app["jobs"].cancel)
         self.add_command("center", self.app["image"].center_window)
         self.add_command("clear_trash", self.app["fileextras"].clear,
                          default_args=["Trash"])
@@ -40,6 +41,7 @@ class Commands(object):
         self.add_command("discard_changes",
                          self.app["manipulate"].button_clicked,
                          default_args=[None, False])
+        self.add_command("export", self.app["manipulate"].export)
         self.add_command("first", self.app["image"].move_pos,
                          default_args=[False], supports_count=True)
         self.add_command("first_lib", self.app["library"].move_pos,
@@ -87,6 +89,7 @@ class Commands(object):
         self.add_command("q", self.app.quit_wrapper)
         self.add_command("q!", self.app.quit_wrapper,
                          default_args=[True])
+        self.add_command("redo", self.app["journal"].redo)
         self.add_command("reload_lib", self.app["library"].reload,
                          default_args=["."])
         self.add_command("rotate", self.app["manipulate"].rotate,
@@ -109,9 +112,12 @@ class Commands(object):
         self.add_command("set slideshow_delay", self.app["slideshow"].set_delay,
                          optional_args=["value"], supports_count=True)
         self.add_command("set statusbar!", self.app["statusbar"].toggle)
+        self.add_command("set watch!", self.app["watcher"].toggle)
         self.add_command("shrink_lib", self.app["library"].resize,
                          default_args=[False, False], optional_args=["value"],
                          supports_count=True)
+        self.add_command("sort", self.app["fileextras"].sort,
+                         positional_args=["method"])
         self.add_command("slideshow", self.app["slideshow"].toggle,
                          supports_count=True)
         self.add_command("slideshow_delay", self.app["slideshow"].set_delay,
@@ -125,6 +131,7 @@ class Commands(object):
                          default_args=[self.app["mark"].marked],
                          positional_args=["tagname"])
         self.add_command("thumbnail", self.app["thumbnail"].toggle)
+        self.add_command("undo", self.app["journal"].undo)
         self.add_command("version", self.app["information"].show_version_info)
         self.add_command("zoom_in", self.app["window"].zoom,
                          default_args=[True], optional_args=["steps"],
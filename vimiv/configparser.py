@@ -7,6 +7,7 @@ import sys
 
 from gi.repository import GLib
 from vimiv.helpers import error_message
+from vimiv.sorting import METHODS
 
 
 def set_defaults():
@@ -24,6 +25,12 @@ def set_defaults():
                "search_case_sensitive": True,
                "incsearch": True,
                "recursive": False,
+               "watch": False,
+               "watch_follow": False,
+               "file_index": False,
+               "non_destructive": False,
+               "undo_budget": 500,
+               "sort": "natural",
                "rescale_svg": True,
                "overzoom": False,
                "copy_to_primary": False,
@@ -77,9 +84,13 @@ def overwrite_section(key, config, settings):
             elif setting in ["library_width", "slideshow_delay",
                              "file_check_amount", "commandline_padding",
                              "thumb_padding", "completion_height",
-                             "border_width"]:
+                             "border_width", "undo_budget"]:
                 # Must be an integer
                 file_set = int(section[setting])
+            elif setting == "sort":
+                file_set = section[setting]
+                if file_set not in METHODS:
+                    raise ValueError
             elif setting == "desktop_start_dir":
                 file_set = os.path.expanduser(section[setting])
                 # Do not change the setting if the directory doesn't exist
@@ -0,0 +1,163 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Non-destructive edits stored in sidecar files next to the images.
+
+The edits of an image are a list of operations saved as JSON in a file called
+like the image with .vimiv appended. An operation is either a tuple of
+"transform" and a transformation as created by imageactions or a tuple of
+"enhance" and a dictionary of the bri, con and sha factors. Edits are applied
+whenever the image or its thumbnail is shown and written into the image only
+when exporting it.
+"""
+
+import json
+import os
+import tempfile
+
+from gi.repository import GdkPixbuf, GLib
+from PIL import Image
+from vimiv import enhance, imageactions
+
+SUFFIX = ".vimiv"
+DEFAULT_MANIPULATIONS = {"bri": 1, "con": 1, "sha": 1}
+
+
+def pixbuf_from_image(im):
+    """Return a GdkPixbuf.Pixbuf containing the data of a PIL image.
+
+    Args:
+        im: PIL image in mode RGB or RGBA.
+    """
+    g_data = GLib.Bytes.new(im.tobytes())
+    w, h = im.size
+    has_alpha = im.mode == "RGBA"
+    channels = 4 if has_alpha else 3
+    return GdkPixbuf.Pixbuf.new_from_bytes(
+        g_data, GdkPixbuf.Colorspace.RGB, has_alpha, 8, w, h, channels * w)
+
+
+def image_from_pixbuf(pixbuf):
+    """Return a PIL image in mode RGB or RGBA containing a pixbuf's data."""
+    mode = "RGBA" if pixbuf.get_has_alpha() else "RGB"
+    size = (pixbuf.get_width(), pixbuf.get_height())
+    rowstride = pixbuf.get_rowstride()
+    # The last row is not padded to the full rowstride
+    data = bytes(pixbuf.get_pixels()).ljust(rowstride * size[1], b"\0")
+    return Image.frombytes(mode, size, data, "raw", mode, rowstride)
+
+
+def get_sidecar(path):
+    """Return the path to the sidecar file of an image."""
+    return os.path.realpath(path) + SUFFIX
+
+
+def get_mtime(path):
+    """Return the modification time of the sidecar of an image or None."""
+    try:
+        return os.path.getmtime(get_sidecar(path))
+    except OSError:
+        return None
+
+
+def has_edits(path):
+    """Return True if an image has non-destructive edits."""
+    return os.path.isfile(get_sidecar(path))
+
+
+def load(path):
+    """Return the list of edits of an image.
+
+    Sidecars which cannot be read are ignored.
+
+    Args:
+        path: Path to the image.
+    """
+    try:
+        with open(get_sidecar(path)) as f:
+            stored = json.load(f)["operations"]
+        operations = []
+        for name, value in stored:
+            if name == "transform":
+                operations.append((name, tuple(value)))
+            elif name == "enhance":
+                operations.append(
+                    (name, {key: float(value[key])
+                            for key in DEFAULT_MANIPULATIONS}))
+        return operations
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def save(path, operations):
+    """Store the list of edits of an image, remove the sidecar if empty.
+
+    Args:
+        path: Path to the image.
+        operations: List of edits to store.
+    """
+    sidecar = get_sidecar(path)
+    if not operations:
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+        return
+    fd, tmpfile = tempfile.mkstemp(dir=os.path.dirname(sidecar))
+    with os.fdopen(fd, "w") as f:
+        json.dump({"operations": operations}, f)
+    os.replace(tmpfile, sidecar)
+
+
+def push(path, operation):
+    """Add an edit to the list of edits of an image.
+
+    Consecutive transformations are composed into one.
+
+    Args:
+        path: Path to the image.
+        operation: Edit to add.
+    """
+    operations = load(path)
+    name, value = operation
+    if name == "transform":
+        if operations and operations[-1][0] == "transform":
+            value = imageactions.compose(operations.pop()[1], value)
+        if value != imageactions.IDENTITY:
+            operations.append((name, value))
+    elif value != DEFAULT_MANIPULATIONS:
+        operations.append((name, dict(value)))
+    save(path, operations)
+
+
+def move(src, dest):
+    """Move the sidecar of an image that is about to be moved or renamed.
+
+    The sidecar of a symbolic link belongs to its target and is kept.
+
+    Args:
+        src: Current path of the image.
+        dest: New path of the image.
+    """
+    sidecar = get_sidecar(src)
+    if not os.path.islink(src) and os.path.isfile(sidecar):
+        os.replace(sidecar, get_sidecar(dest))
+
+
+def apply_to_pixbuf(pixbuf, operations):
+    """Return a pixbuf with a list of edits applied.
+
+    Rotating and flipping is done by GdkPixbuf, only enhancing requires
+    converting the pixbuf to a PIL image and back.
+
+    Args:
+        pixbuf: Upright GdkPixbuf.Pixbuf to act on.
+        operations: List of edits as returned by load.
+    """
+    for name, value in operations:
+        if name == "transform":
+            rotations, flipped = value
+            if rotations:
+                pixbuf = pixbuf.rotate_simple(90 * rotations)
+            if flipped:
+                pixbuf = pixbuf.flip(True)
+        else:
+            enhanced = enhance.enhance(image_from_pixbuf(pixbuf), value)
+            pixbuf = pixbuf_from_image(enhanced)
+    return pixbuf
@@ -0,0 +1,154 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Apply brightness, contrast and sharpness to an image in two passes.
+
+The result equals chaining ImageEnhance.Brightness, Contrast and Sharpness up
+to rounding. Brightness and contrast are fused into one lookup table, the
+sharpness is a single 3x3 convolution mixing the image with its smoothed
+version. Large images are processed in horizontal strips to limit memory.
+"""
+
+from PIL import Image, ImageFilter
+
+# Weights of ImageFilter.SMOOTH used by ImageEnhance.Sharpness
+SMOOTH_WEIGHTS = (1, 1, 1, 1, 5, 1, 1, 1, 1)
+SMOOTH_SCALE = 13
+
+# Weights used by PIL to convert RGB to L
+LUMA = (0.299, 0.587, 0.114)
+
+# Number of pixels processed at once by enhance_strips
+STRIP_PIXELS = 1 << 20
+
+
+def _clip(value):
+    return min(255, max(0, int(value + 0.5)))
+
+
+def get_mode(im):
+    """Return the mode an image is enhanced in, RGB or RGBA."""
+    if im.mode in ["RGB", "RGBA"]:
+        return im.mode
+    if "A" in im.getbands() or "transparency" in im.info:
+        return "RGBA"
+    return "RGB"
+
+
+def prepare(im):
+    """Return the image in a mode supported by enhance and GdkPixbuf.
+
+    Args:
+        im: PIL image to prepare.
+    Return:
+        The image itself if it is RGB or RGBA, else a converted copy.
+    """
+    mode = get_mode(im)
+    return im if im.mode == mode else im.convert(mode)
+
+
+def get_lut(histogram, mode, bri, con):
+    """Return the lookup table applying brightness and contrast.
+
+    Args:
+        histogram: Histogram of the image as returned by im.histogram().
+        mode: Mode of the image, RGB or RGBA.
+        bri: Brightness factor.
+        con: Contrast factor.
+    """
+    bright = [_clip(value * bri) for value in range(256)]
+    mean = 0
+    # Contrast is relative to the mean grey value of the brightened image
+    if con != 1:
+        size = sum(histogram[:256])
+        for band, weight in enumerate(LUMA):
+            band_histogram = histogram[256 * band:256 * (band + 1)]
+            band_sum = sum(amount * value
+                           for amount, value in zip(band_histogram, bright))
+            mean += weight * band_sum / size
+        mean = int(mean + 0.5)
+    lut = [_clip(mean + con * (value - mean)) for value in bright] * 3
+    if mode == "RGBA":
+        lut += list(range(256))  # Keep transparency
+    return lut
+
+
+def get_kernel(sha):
+    """Return the convolution kernel applying the sharpness factor sha."""
+    weights = [(1 - sha) * weight / SMOOTH_SCALE for weight in SMOOTH_WEIGHTS]
+    weights[4] += sha
+    return ImageFilter.Kernel((3, 3), weights, scale=1)
+
+
+def enhance(im, manipulations, histogram=None):
+    """Return the image with brightness, contrast and sharpness applied.
+
+    Args:
+        im: PIL image in mode RGB or RGBA, see prepare.
+        manipulations: Dictionary of the bri, con and sha factors.
+        histogram: Histogram of im if it is already known.
+    """
+    bri, con, sha = [manipulations[name] for name in ["bri", "con", "sha"]]
+    if histogram is None and con != 1:
+        histogram = im.histogram()
+    lut = get_lut(histogram, im.mode, bri, con) \
+        if bri != 1 or con != 1 else None
+    return _apply(im, lut, sha)
+
+
+def _apply(im, lut, sha):
+    if lut:
+        im = im.point(lut)
+    if sha != 1:
+        # Kernels only support RGB images
+        if im.mode == "RGBA":
+            alpha = im.split()[-1]
+            im = im.convert("RGB").filter(get_kernel(sha))
+            im.putalpha(alpha)
+        else:
+            im = im.filter(get_kernel(sha))
+    return im
+
+
+def _get_histogram(im, mode, strip_height):
+    """Return the histogram of im converted to mode converting in strips."""
+    if im.mode == mode:
+        return im.histogram()
+    width, height = im.size
+    histogram = [0] * (256 * len(mode))
+    for top in range(0, height, strip_height):
+        strip = im.crop((0, top, width, min(top + strip_height, height)))
+        strip_histogram = strip.convert(mode).histogram()
+        histogram = [a + b for a, b in zip(histogram, strip_histogram)]
+    return histogram
+
+
+def enhance_strips(im, manipulations):
+    """Return the enhanced image processing it in horizontal strips.
+
+    Only the image and the result are kept in memory at full size. Strips
+    overlap by one row, so the sharpness kernel sees all neighbours of every
+    pixel and the result equals enhance(prepare(im), manipulations).
+
+    Args:
+        im: PIL image in any mode.
+        manipulations: Dictionary of the bri, con and sha factors.
+    """
+    bri, con, sha = [manipulations[name] for name in ["bri", "con", "sha"]]
+    mode = get_mode(im)
+    width, height = im.size
+    strip_height = max(16, STRIP_PIXELS // max(width, 1))
+    histogram = _get_histogram(im, mode, strip_height) if con != 1 else None
+    lut = get_lut(histogram, mode, bri, con) if bri != 1 or con != 1 else None
+    result = Image.new(mode, im.size)
+    for top in range(0, height, strip_height):
+        bottom = min(top + strip_height, height)
+        overlap_top = max(top - 1, 0)
+        overlap_bottom = min(bottom + 1, height)
+        strip = im.crop((0, overlap_top, width, overlap_bottom))
+        if strip.mode != mode:
+            strip = strip.convert(mode)
+        strip = _apply(strip, lut, sha)
+        # Drop the overlapping rows again
+        strip = strip.crop((0, top - overlap_top, width, bottom - overlap_top))
+        result.paste(strip, (0, top))
+    result.info = im.info
+    return result
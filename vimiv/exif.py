@@ -0,0 +1,180 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Read the exif tags used by vimiv without decoding any image data.
+
+Only the APP1 segment of JPEG files or the header of TIFF files is read and
+only the orientation and the dates are extracted. Results are cached by path
+and revalidated using modification time and size. Many files are processed in
+parallel on a pool of worker threads.
+"""
+
+import collections
+import os
+import struct
+from multiprocessing.pool import ThreadPool as Pool
+
+from gi.repository import GLib
+
+ORIENTATION = 274
+DATETIME = 306
+DATETIME_ORIGINAL = 36867
+EXIF_IFD_POINTER = 34665
+TAGS = (ORIENTATION, DATETIME, DATETIME_ORIGINAL)
+
+# Values of the tags in TAGS found in a file, position of the orientation value
+# in the file or None and byte order of the exif data, "<" or ">"
+ExifData = collections.namedtuple(
+    "ExifData", ["tags", "orientation_offset", "byte_order"])
+
+EMPTY = ExifData({}, None, "<")
+
+_cache = {}
+
+_cpu_count = os.cpu_count()
+_thread_pool = Pool(max(1, _cpu_count - 1) if _cpu_count else 1)
+
+
+def _parse_ifd(data, offset, byte_order, tags, positions):
+    count = struct.unpack_from(byte_order + "H", data, offset)[0]
+    sub_ifd = None
+    for i in range(count):
+        entry = offset + 2 + 12 * i
+        tag, typ, amount = struct.unpack_from(byte_order + "HHI", data, entry)
+        if tag == EXIF_IFD_POINTER:
+            sub_ifd = struct.unpack_from(byte_order + "I", data, entry + 8)[0]
+        elif tag == ORIENTATION and typ == 3:
+            tags[tag] = struct.unpack_from(byte_order + "H", data, entry + 8)[0]
+            positions[tag] = entry + 8
+        elif tag in TAGS and typ == 2:
+            value_offset = entry + 8
+            if amount > 4:
+                value_offset = struct.unpack_from(byte_order + "I", data,
+                                                  entry + 8)[0]
+            value = data[value_offset:value_offset + amount]
+            tags[tag] = value.split(b"\x00")[0].decode("ascii", "replace")
+    return sub_ifd
+
+
+def parse_tiff(data):
+    """Parse the tags in TAGS from TIFF formatted exif data.
+
+    Args:
+        data: Bytes starting with the TIFF header.
+    Return:
+        Tuple of the tag dictionary, the position of the orientation value in
+        data or None and the byte order.
+    """
+    byte_order = "<" if data[:2] == b"II" else ">"
+    tags = {}
+    positions = {}
+    try:
+        ifd = struct.unpack_from(byte_order + "I", data, 4)[0]
+        sub_ifd = _parse_ifd(data, ifd, byte_order, tags, positions)
+        if sub_ifd:
+            _parse_ifd(data, sub_ifd, byte_order, tags, positions)
+    except struct.error:  # Truncated or corrupt exif data
+        pass
+    return tags, positions.get(ORIENTATION), byte_order
+
+
+def _find_app1(f):
+    """Return the exif data in the APP1 segment of a JPEG and its position."""
+    if f.read(2) != b"\xff\xd8":
+        return None, None
+    while True:
+        marker = f.read(2)
+        if len(marker) != 2 or marker[0] != 0xff:
+            return None, None
+        # Start of scan or end of image, no exif data
+        if marker[1] in [0xda, 0xd9]:
+            return None, None
+        length = struct.unpack(">H", f.read(2))[0]
+        if marker[1] == 0xe1:
+            position = f.tell()
+            segment = f.read(length - 2)
+            if segment.startswith(b"Exif\x00\x00"):
+                return segment[6:], position + 6
+        else:
+            f.seek(length - 2, 1)
+
+
+def read_exif(path):
+    """Read the exif information of a file without using the cache.
+
+    Args:
+        path: Path to the file.
+    Return:
+        ExifData of the file.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(4)
+            f.seek(0)
+            if header in [b"II*\x00", b"MM\x00*"]:
+                # Tags of TIFF files are usually at the beginning
+                data, position = f.read(65536), 0
+            else:
+                data, position = _find_app1(f)
+    except (OSError, struct.error):
+        return EMPTY
+    if not data:
+        return EMPTY
+    tags, orientation_offset, byte_order = parse_tiff(data)
+    if orientation_offset is not None:
+        orientation_offset += position
+    return ExifData(tags, orientation_offset, byte_order)
+
+
+def get_exif(path):
+    """Return the exif information of a file, reading it only if necessary.
+
+    Args:
+        path: Path to the file.
+    Return:
+        ExifData of the file.
+    """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return EMPTY
+    key = (stat_result.st_mtime_ns, stat_result.st_size)
+    cached = _cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    data = read_exif(path)
+    _cache[path] = (key, data)
+    return data
+
+
+def get_tags(path):
+    """Return the dictionary of exif tags of a file."""
+    return get_exif(path).tags
+
+
+def uncache(path):
+    """Remove the cached exif information of a file, e.g. after writing it."""
+    _cache.pop(path, None)
+
+
+def get_exif_many(paths):
+    """Return the exif information of many files read in parallel.
+
+    Args:
+        paths: List of paths.
+    Return:
+        Dictionary of ExifData by path.
+    """
+    return dict(zip(paths, _thread_pool.map(get_exif, paths)))
+
+
+def get_exif_async(path, callback, *args):
+    """Read the exif information of a file in the background.
+
+    Args:
+        path: Path to the file.
+        callback: Function called from the main loop with the path, the
+            ExifData and args.
+        args: Additional arguments passed to callback.
+    """
+    def do_callback(data):
+        GLib.idle_add(callback, path, data, *args)
+    _thread_pool.apply_async(get_exif, (path,), callback=do_callback)
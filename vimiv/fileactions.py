@@ -5,8 +5,8 @@ import os
 import shutil
 from random import shuffle
 
-from gi.repository import Gdk, GdkPixbuf, Gtk
-from PIL import Image
+from gi.repository import Gdk, Gtk
+from vimiv import editstack, exif, filetypes, sorting
 from vimiv.helpers import listdir_wrapper
 
 
@@ -38,24 +38,24 @@ def populate_single(arg, recursive):
         directory = os.path.dirname(arg)
         if not directory:  # Default to current directory
             directory = "./"
-        basename = os.path.basename(arg)
-        paths = listdir_wrapper(directory)
+        paths = sorting.sort_paths(os.path.join(directory, path)
+                                   for path in listdir_wrapper(directory))
         # Set the argument to the beginning of the list
-        pos = paths.index(basename)
-        paths = [os.path.join(directory, path)
-                 for path in paths[pos:] + paths[:pos]]
+        pos = paths.index(os.path.join(directory, os.path.basename(arg)))
+        paths = paths[pos:] + paths[:pos]
     elif os.path.isdir(arg) and recursive:
-        paths = sorted(recursive_search(arg))
+        paths = sorting.sort_paths(recursive_search(arg))
     return paths
 
 
-def populate(args, recursive=False, shuffle_paths=False):
+def populate(args, recursive=False, shuffle_paths=False, sort=False):
     """Populate a list of files out given paths.
 
     Args:
         args: Paths given.
         recursive: If True search path recursively for images.
         shuffle_paths: If True shuffle found paths randomly.
+        sort: If True sort found paths with the current sort method.
     Return:
         Found paths, position of first given path.
     """
@@ -76,6 +76,8 @@ def populate(args, recursive=False, shuffle_paths=False):
     # Remove unsupported files
     paths = [possible_path for possible_path in paths
              if is_image(possible_path)]
+    if sort:
+        paths = sorting.sort_paths(paths)
 
     # Shuffle
     if shuffle_paths:
@@ -84,7 +86,7 @@ def populate(args, recursive=False, shuffle_paths=False):
     return paths, 0
 
 
-def move_to_trash(filelist, trashdir):
+def move_to_trash(filelist, trashdir, moved=None):
     """Move every file in filelist to the Trash.
 
     If it is a directory, an error is thrown.
@@ -92,7 +94,11 @@ def move_to_trash(filelist, trashdir):
     Args:
         filelist: The list of files to operate on.
         trashdir: The directory to move the files to.
+        moved: List to which tuples of source and destination of every moved
+            file are appended or None.
     """
+    if moved is None:
+        moved = []
     # Create the directory if it isn't there yet
     if not os.path.isdir(trashdir):
         os.mkdir(trashdir)
@@ -111,10 +117,29 @@ def move_to_trash(filelist, trashdir):
                 while os.path.exists(ndelfile):
                     backnum += 1
                     ndelfile = delfile + "." + str(backnum)
+                editstack.move(delfile, ndelfile)
                 os.rename(delfile, ndelfile)
+                moved.append((delfile, ndelfile))
+            editstack.move(im, delfile)
             shutil.move(im, trashdir)
+            moved.append((im, delfile))
 
-        return 0  # Success
+    return 0  # Success
+
+
+def file_signature(filename):
+    """Return a tuple which changes whenever the content of a file changes.
+
+    Args:
+        filename: Name of the file to check.
+    Return:
+        Tuple of modification time and size or None if the file is missing.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
 
 
 def is_image(filename):
@@ -124,7 +149,7 @@ def is_image(filename):
         filename: Name of file to check.
     """
     complete_name = os.path.abspath(os.path.expanduser(filename))
-    return bool(GdkPixbuf.Pixbuf.get_file_info(complete_name)[0])
+    return filetypes.is_image(complete_name)
 
 
 class FileExtras(object):
@@ -152,6 +177,27 @@ class FileExtras(object):
             fil = os.path.join(directory, fil)
             os.remove(fil)
 
+    def sort(self, method):
+        """Sort the current filelist keeping the current image focused.
+
+        Args:
+            method: Sort method, one of natural, mtime, size and exif.
+        """
+        if not sorting.set_method(method):
+            self.app["statusbar"].message(
+                "Unknown sort method " + method, "error")
+            return
+        if not self.app.paths:
+            return
+        old_paths = list(self.app.paths)
+        current = old_paths[self.app.index]
+        # Sort in place, a running pathstream keeps merging into the list
+        self.app.paths[:] = sorting.sort_paths(old_paths)
+        self.app.index = self.app.paths.index(current)
+        if self.app["thumbnail"].toggled:
+            self.app["thumbnail"].update_paths(old_paths)
+        self.app["statusbar"].update_info()
+
     def format_files(self, string):
         """Format image names in filelist according to a formatstring.
 
@@ -173,38 +219,37 @@ class FileExtras(object):
         # Check if exifdata is available and needed
         tofind = ("%" in string)
         if tofind:
-            try:
-                for fil in self.app.paths:
-                    with Image.open(fil) as im:
-                        exif = im._getexif()
-                        if not (exif and 306 in exif):
-                            raise AttributeError
-            except AttributeError:
-                self.app["statusbar"].message(
-                    "No exif data for %s available" % (fil), "error")
-                return
-
+            exif_data = exif.get_exif_many(self.app.paths)
+            for fil in self.app.paths:
+                if exif.DATETIME not in exif_data[fil].tags:
+                    self.app["statusbar"].message(
+                        "No exif data for %s available" % (fil), "error")
+                    return
+
+        moved = []
         for i, fil in enumerate(self.app.paths):
             ending = os.path.splitext(fil)[1]
             num = "%03d" % (i + 1)
             # Exif stuff
             if tofind:
-                with Image.open(fil) as im:
-                    exif = im._getexif()
-                    date = exif[306]
-                    time = date.split()[1].split(":")
-                    date = date.split()[0].split(":")
-                    outstring = string.replace("%Y", date[0])  # year
-                    outstring = outstring.replace("%m", date[1])  # month
-                    outstring = outstring.replace("%d", date[2])  # day
-                    outstring = outstring.replace("%H", time[0])  # hour
-                    outstring = outstring.replace("%M", time[1])  # minute
-                    outstring = outstring.replace("%S", time[2])  # second
+                date = exif_data[fil].tags[exif.DATETIME]
+                time = date.split()[1].split(":")
+                date = date.split()[0].split(":")
+                outstring = string.replace("%Y", date[0])  # year
+                outstring = outstring.replace("%m", date[1])  # month
+                outstring = outstring.replace("%d", date[2])  # day
+                outstring = outstring.replace("%H", time[0])  # hour
+                outstring = outstring.replace("%M", time[1])  # minute
+                outstring = outstring.replace("%S", time[2])  # second
             else:
                 outstring = string
             # Ending
             outstring += num + ending
+            editstack.move(fil, outstring)
             os.rename(fil, outstring)
+            moved.append((fil, os.path.abspath(outstring)))
+        self.app["journal"].record(
+            "format", [("move", src, dest) for src, dest in moved])
 
         # Reload everything
         self.reload_changes(os.getcwd(), True)
@@ -240,18 +285,22 @@ class FileExtras(object):
             old_pos_im = self.app.get_pos(False, "im")
             # Get all files in directory again
             pathdir = os.path.dirname(self.app.paths[old_pos_im])
-            files = [os.path.join(pathdir, fil)
-                     for fil in sorted(os.listdir(pathdir))]
-            self.app.paths, self.app.index = populate(files)
+            snapshot = self.app["library"].dircache.get(pathdir, True)
+            files = [snapshot.get_path(fil) for fil in snapshot.names]
+            # Sort keys may have changed as well
+            for fil in files:
+                sorting.uncache(fil)
+            old_paths = self.app.paths
+            self.app.paths, self.app.index = populate(files, sort=True)
             # Expand library if set by user and all paths were removed
             if self.app["library"].expand and not self.app.paths:
                 self.app["library"].treeview.set_hexpand(True)
             # Refocus the current position
-            if self.app["thumbnail"].toggled:
+            if self.app["thumbnail"].toggled and self.app.paths:
                 old_pos_thu = self.app.get_pos(False, "thu")
-                for image in self.app.paths:
-                    self.app["thumbnail"].reload(image)
-                self.app["thumbnail"].move_to_pos(old_pos_thu)
+                self.app["thumbnail"].update_paths(old_paths)
+                self.app["thumbnail"].move_to_pos(
+                    min(old_pos_thu, len(self.app.paths) - 1))
             else:
                 self.app["eventhandler"].num_str = str(old_pos_im + 1)
                 self.app["image"].move_pos()
@@ -0,0 +1,149 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Persistent index of images found when searching directories recursively.
+
+The index is a SQLite database storing path, modification time, size, image
+dimensions and format of every image together with the subdirectories of
+every directory. A directory is only scanned again if its modification time
+differs from the one in the index.
+"""
+
+import collections
+import sqlite3
+from threading import Lock
+
+from gi.repository import GdkPixbuf
+from vimiv import filetypes
+
+FileRecord = collections.namedtuple(
+    "FileRecord", ["path", "mtime_ns", "size", "width", "height", "format"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS subdirectories (
+    parent TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    mtime_ns INTEGER,
+    size INTEGER,
+    width INTEGER,
+    height INTEGER,
+    format TEXT
+);
+CREATE INDEX IF NOT EXISTS subdirectories_parent ON subdirectories (parent);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+"""
+
+
+def create_record(path, stat_result):
+    """Return the FileRecord of an image.
+
+    Args:
+        path: Absolute path to the image.
+        stat_result: os.stat_result of path.
+    Return:
+        The FileRecord or None if path is no image.
+    """
+    fmt = filetypes.get_format(path, stat_result)
+    if fmt is None:
+        return None
+    _, width, height = GdkPixbuf.Pixbuf.get_file_info(path)
+    return FileRecord(path, stat_result.st_mtime_ns, stat_result.st_size,
+                      width, height, fmt)
+
+
+class FileIndex(object):
+    """SQLite database of directories and the images in them.
+
+    The database is shared between threads, every access is guarded by a lock.
+
+    Attributes:
+        filename: Path to the database file.
+
+        _connection: sqlite3.Connection to the database.
+        _lock: Lock guarding the connection.
+    """
+
+    def __init__(self, filename):
+        """Open the database creating the tables if necessary.
+
+        Args:
+            filename: Path to the database file.
+        """
+        self.filename = filename
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = Lock()
+
+    def get_directory(self, directory, mtime_ns):
+        """Return the content of a directory if the index is up to date.
+
+        Args:
+            directory: Absolute path of the directory.
+            mtime_ns: Current modification time of the directory.
+        Return:
+            Tuple of subdirectories and images or None if the directory is not
+            in the index or changed.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT mtime_ns FROM directories WHERE path = ?",
+                (directory,)).fetchone()
+            if row is None or row[0] != mtime_ns:
+                return None
+            subdirectories = [path for path, in self._connection.execute(
+                "SELECT path FROM subdirectories WHERE parent = ?",
+                (directory,))]
+            images = [path for path, in self._connection.execute(
+                "SELECT path FROM files WHERE directory = ?", (directory,))]
+        return subdirectories, images
+
+    def set_directory(self, directory, mtime_ns, subdirectories, records):
+        """Replace the content of a directory in the index.
+
+        Args:
+            directory: Absolute path of the directory.
+            mtime_ns: Modification time of the directory when it was scanned.
+            subdirectories: List of absolute paths of all subdirectories.
+            records: List of FileRecords of all images in the directory.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?)",
+                (directory, mtime_ns))
+            self._connection.execute(
+                "DELETE FROM subdirectories WHERE parent = ?", (directory,))
+            self._connection.executemany(
+                "INSERT INTO subdirectories VALUES (?, ?)",
+                [(directory, path) for path in subdirectories])
+            self._connection.execute(
+                "DELETE FROM files WHERE directory = ?", (directory,))
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(record.path, directory, record.mtime_ns, record.size,
+                  record.width, record.height, record.format)
+                 for record in records])
+
+    def lookup(self, path):
+        """Return the FileRecord of an image in the index.
+
+        Args:
+            path: Absolute path to the image.
+        Return:
+            The FileRecord or None if the image is not in the index.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT path, mtime_ns, size, width, height, format FROM files "
+                "WHERE path = ?", (path,)).fetchone()
+        return FileRecord(*row) if row else None
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,121 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Classify files as images without asking GdkPixbuf for every file.
+
+The format of a file is found by checking its extension and the first few bytes
+of its content against tables of well-known formats. Only files which can not
+be classified this way are passed to GdkPixbuf.Pixbuf.get_file_info. Results
+are cached by path and revalidated using inode and modification time, so
+listing the same directory again does not touch the file contents.
+"""
+
+import os
+from stat import S_ISREG
+
+from gi.repository import GdkPixbuf
+
+# Amount of bytes read to check the magic bytes
+HEADER_SIZE = 16
+
+# Magic bytes at the start of files of common image formats
+MAGIC_BYTES = [(b"\xff\xd8\xff", "jpeg"),
+               (b"\x89PNG\r\n\x1a\n", "png"),
+               (b"GIF87a", "gif"),
+               (b"GIF89a", "gif"),
+               (b"BM", "bmp"),
+               (b"II*\x00", "tiff"),
+               (b"MM\x00*", "tiff"),
+               (b"\x00\x00\x01\x00", "ico")]
+
+# Extensions of the formats in MAGIC_BYTES. Files with one of these extensions
+# are not passed to GdkPixbuf if the magic bytes do not match.
+IMAGE_EXTENSIONS = {"jpg": "jpeg", "jpeg": "jpeg", "jpe": "jpeg",
+                    "png": "png", "gif": "gif", "bmp": "bmp", "tif": "tiff",
+                    "tiff": "tiff", "ico": "ico", "webp": "webp"}
+
+# Extensions of common files that are never images
+OTHER_EXTENSIONS = {"txt", "md", "rst", "log", "pdf", "html", "htm", "css",
+                    "js", "json", "py", "pyc", "sh", "c", "h", "xmp", "pp3",
+                    "zip", "gz", "xz", "bz2", "tar", "7z", "rar", "iso",
+                    "mp3", "flac", "ogg", "wav", "m4a", "mp4", "mkv", "avi",
+                    "mov", "webm", "wmv", "m4v", "mts"}
+
+_cache = {}
+_supported_formats = set()
+
+
+def get_supported_formats():
+    """Return the names of all formats GdkPixbuf is able to load."""
+    if not _supported_formats:
+        _supported_formats.update(
+            fmt.get_name() for fmt in GdkPixbuf.Pixbuf.get_formats())
+    return _supported_formats
+
+
+def sniff(header):
+    """Return the format of a file by checking its magic bytes.
+
+    Args:
+        header: The first bytes of the file.
+    Return:
+        Name of the format or None if it is unknown.
+    """
+    for magic, fmt in MAGIC_BYTES:
+        if header.startswith(magic):
+            return fmt
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _classify(filename):
+    extension = os.path.splitext(filename)[1][1:].lower()
+    if extension in OTHER_EXTENSIONS:
+        return None
+    try:
+        with open(filename, "rb") as f:
+            header = f.read(HEADER_SIZE)
+    except OSError:
+        return None
+    fmt = sniff(header)
+    if fmt:
+        return fmt if fmt in get_supported_formats() else None
+    elif extension in IMAGE_EXTENSIONS:
+        return None
+    # Unknown to us, e.g. svg, let GdkPixbuf decide
+    info = GdkPixbuf.Pixbuf.get_file_info(filename)[0]
+    return info.get_name() if info else None
+
+
+def get_format(filename, stat_result=None):
+    """Return the image format of a file.
+
+    Args:
+        filename: Name of the file to check.
+        stat_result: os.stat_result of filename if it is already known.
+    Return:
+        Name of the GdkPixbuf format or None if the file is no image.
+    """
+    try:
+        if stat_result is None:
+            stat_result = os.stat(filename)
+    except OSError:
+        return None
+    if not S_ISREG(stat_result.st_mode):
+        return None
+    key = (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns)
+    cached = _cache.get(filename)
+    if cached and cached[0] == key:
+        return cached[1]
+    fmt = _classify(filename)
+    _cache[filename] = (key, fmt)
+    return fmt
+
+
+def is_image(filename, stat_result=None):
+    """Check whether a file is an image GdkPixbuf can load.
+
+    Args:
+        filename: Name of the file to check.
+        stat_result: os.stat_result of filename if it is already known.
+    """
+    return get_format(filename, stat_result) is not None
@@ -3,8 +3,11 @@
 
 import gzip
 import os
+from collections import OrderedDict
+from collections.abc import MutableSet, Sequence, Set
 
 from gi.repository import Gtk
+from vimiv.sorting import natural_sorted
 
 
 def listdir_wrapper(path, show_hidden=False):
@@ -14,14 +17,175 @@ def listdir_wrapper(path, show_hidden=False):
         path: Path of the directory in which os.listdir is called.
         show_hidden: If true, show hidden files. Else do not.
     Return:
-        Sorted list of files in path.
+        Naturally sorted list of files in path.
     """
-    all_files = sorted(os.listdir(os.path.expanduser(path)))
+    all_files = natural_sorted(os.listdir(os.path.expanduser(path)))
     if show_hidden:
         return all_files
     return [fil for fil in all_files if not fil.startswith(".")]
 
 
+class PathList(list):
+    """List of paths with constant time lookup of positions.
+
+    The position of every path is stored in a dictionary. Appending keeps the
+    dictionary up to date, any other modification invalidates it and it is
+    rebuilt on the next lookup.
+    """
+
+    def __init__(self, paths=()):
+        super(PathList, self).__init__(paths)
+        self._positions = None
+
+    def _get_positions(self):
+        if self._positions is None:
+            self._positions = {}
+            for i, path in enumerate(self):
+                self._positions.setdefault(path, i)
+        return self._positions
+
+    def _invalidate(self):
+        self._positions = None
+
+    def index(self, path, *args):
+        """Return the position of path in constant time.
+
+        Args:
+            path: The path to look up.
+            args: Start and stop like list.index. Fall back to list.index.
+        """
+        if args:
+            return super(PathList, self).index(path, *args)
+        try:
+            return self._get_positions()[path]
+        except KeyError:
+            raise ValueError("%r is not in list" % (path))
+
+    def __contains__(self, path):
+        return path in self._get_positions()
+
+    def append(self, path):
+        """Append path keeping the positions up to date."""
+        super(PathList, self).append(path)
+        if self._positions is not None:
+            self._positions.setdefault(path, len(self) - 1)
+
+    def extend(self, paths):
+        """Extend by paths keeping the positions up to date."""
+        for path in paths:
+            self.append(path)
+
+    def __iadd__(self, paths):
+        self.extend(paths)
+        return self
+
+    def __setitem__(self, key, value):
+        super(PathList, self).__setitem__(key, value)
+        self._invalidate()
+
+    def __delitem__(self, key):
+        super(PathList, self).__delitem__(key)
+        self._invalidate()
+
+    def __imul__(self, value):
+        result = super(PathList, self).__imul__(value)
+        self._invalidate()
+        return result
+
+    def insert(self, index, path):
+        """Insert path before index."""
+        super(PathList, self).insert(index, path)
+        self._invalidate()
+
+    def remove(self, path):
+        """Remove the first occurrence of path."""
+        super(PathList, self).remove(path)
+        self._invalidate()
+
+    def pop(self, *args):
+        """Remove and return the path at the given index, default last."""
+        path = super(PathList, self).pop(*args)
+        self._invalidate()
+        return path
+
+    def clear(self):
+        """Remove all paths."""
+        super(PathList, self).clear()
+        self._invalidate()
+
+    def sort(self, *args, **kwargs):
+        """Sort the paths in place."""
+        super(PathList, self).sort(*args, **kwargs)
+        self._invalidate()
+
+    def reverse(self):
+        """Reverse the paths in place."""
+        super(PathList, self).reverse()
+        self._invalidate()
+
+
+class OrderedSet(MutableSet):
+    """Set which remembers the order in which items were added.
+
+    Membership tests, adding and removing are O(1). Iteration follows the
+    insertion order.
+    """
+
+    def __init__(self, items=()):
+        self._items = OrderedDict.fromkeys(items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __reversed__(self):
+        return reversed(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        """Return the item at position index. This is O(n)."""
+        return list(self._items)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return NotImplemented
+        if isinstance(other, (OrderedSet, Sequence)):
+            return list(self) == list(other)
+        if isinstance(other, Set):
+            return set(self._items) == set(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, list(self))
+
+    def add(self, item):
+        """Add item to the end if it is not in the set yet."""
+        self._items[item] = None
+
+    def discard(self, item):
+        """Remove item if it is in the set."""
+        self._items.pop(item, None)
+
+    def update(self, items):
+        """Add all items in order."""
+        for item in items:
+            self._items[item] = None
+
+    def clear(self):
+        """Remove all items."""
+        self._items.clear()
+
+    def pop(self, last=True):
+        """Remove and return the last or first item."""
+        return self._items.popitem(last)[0]
+
+
 def read_file(filename):
     """Read the content of a file into a list or create file.
 
@@ -5,6 +5,8 @@ import os
 from random import shuffle
 
 from gi.repository import GdkPixbuf, GLib, Gtk
+from vimiv import editstack
+from vimiv.filetypes import get_format
 from vimiv.helpers import get_float_from_str
 
 
@@ -140,8 +142,7 @@ class Image(object):
             pbf_height = int(pbo_height * self.zoom_percent)
             # Rescaling of svg
             name = self.app.paths[self.app.index]
-            info = GdkPixbuf.Pixbuf.get_file_info(name)[0]
-            if info and "svg" in info.get_extensions():
+            if get_format(name) == "svg":
                 pixbuf_final = GdkPixbuf.Pixbuf.new_from_file_at_scale(
                     self.app.paths[self.app.index], -1, pbf_height, True)
             else:
@@ -375,7 +376,12 @@ class Image(object):
                 self.pixbuf_iter = anim.get_iter()
             else:
                 self.is_anim = False
-                self.pixbuf_original = GdkPixbuf.Pixbuf.new_from_file(path)
+                # Show the image as described by its exif orientation and
+                # with its non-destructive edits
+                self.pixbuf_original = editstack.apply_to_pixbuf(
+                    GdkPixbuf.Pixbuf.new_from_file(
+                        path).apply_embedded_orientation(),
+                    editstack.load(path))
                 self.imsize = self.get_available_size()
                 self.zoom_percent = self.get_zoom_percent_to_fit()
             self.update(update_info=True)
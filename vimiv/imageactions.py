@@ -1,60 +1,359 @@
 # vim: ft=python fileencoding=utf-8 sw=4 et sts=4
-"""Actions which act on the actual image file."""
+"""Actions which act on the actual image file.
+
+Rotations and flips are elements of the dihedral group D4 stored as a tuple of
+the number of counterclockwise rotations by 90° and whether the image is
+flipped horizontally afterwards. JPEGs are transformed losslessly if possible.
+"""
 
 import os
-from shutil import which
+import struct
+import tempfile
+from shutil import copy2, copymode, which
 from subprocess import PIPE, Popen
 
 from PIL import Image
+from vimiv import enhance, exif
+from vimiv.filetypes import get_format
+
+IDENTITY = (0, 0)
+FLIP_HORIZONTAL = (0, 1)
+FLIP_VERTICAL = (2, 1)
+
+# Transformation which has to be applied to show an image for every value of
+# the exif orientation tag
+ORIENTATIONS = {1: (0, 0), 2: (0, 1), 3: (2, 0), 4: (2, 1),
+                5: (3, 1), 6: (3, 0), 7: (1, 1), 8: (1, 0)}
+ORIENTATION_TAGS = {value: key for key, value in ORIENTATIONS.items()}
+
+JPEGTRAN_ARGS = {(0, 0): [], (1, 0): ["-rotate", "270"],
+                 (2, 0): ["-rotate", "180"], (3, 0): ["-rotate", "90"],
+                 (0, 1): ["-flip", "horizontal"],
+                 (2, 1): ["-flip", "vertical"],
+                 (3, 1): ["-transpose"], (1, 1): ["-transverse"]}
+
+# Modes of grey images with 16 bits per pixel
+GREY_16 = ["I", "I;16", "I;16B", "I;16L", "I;16N"]
 
+# Info which only applies to the mode an image was loaded in
+MODE_INFO = ["transparency", "background"]
 
-def save_image(im, filename):
+PIL_TRANSPOSITIONS = {(1, 0): Image.ROTATE_90, (2, 0): Image.ROTATE_180,
+                      (3, 0): Image.ROTATE_270, (0, 1): Image.FLIP_LEFT_RIGHT,
+                      (2, 1): Image.FLIP_TOP_BOTTOM, (3, 1): Image.TRANSPOSE,
+                      (1, 1): Image.TRANSVERSE}
+
+
+def save_image(im, filename, fmt=None):
     """Save the image with all the exif keys that exist.
 
+    The image is written to a hidden temporary file next to the image first
+    which then replaces it, so the image is never left half written.
+
     Args:
         im: PIL image to act on.
         filename: Name of the image to save.
+        fmt: Format to save the image in. Defaults to the format given by the
+            extension of filename.
+    """
+    filename = os.path.realpath(filename)
+    directory, basename = os.path.split(filename)
+    fd, tmpfile = tempfile.mkstemp(prefix="." + basename + ".",
+                                   suffix=os.path.splitext(basename)[1],
+                                   dir=directory)
+    os.close(fd)
+    try:
+        kwargs = im.info
+        im.save(tmpfile, fmt, **kwargs)
+        if os.path.exists(filename):
+            copymode(filename, tmpfile)
+        os.replace(tmpfile, filename)
+    except BaseException:
+        os.remove(tmpfile)
+        raise
+
+
+def rotation(cwise):
+    """Return the transformation rotating cwise*90° counterclockwise."""
+    return cwise % 4, 0
+
+
+def flip(horizontal):
+    """Return the transformation flipping horizontally or vertically."""
+    return FLIP_HORIZONTAL if horizontal else FLIP_VERTICAL
+
+
+def compose(first, second):
+    """Return the transformation applying first and then second.
+
+    Args:
+        first: Transformation applied first.
+        second: Transformation applied second.
     """
-    kwargs = im.info
-    im.save(filename, **kwargs)
+    # Rotating a flipped image counterclockwise equals rotating the image
+    # clockwise and flipping it afterwards
+    sign = -1 if first[1] else 1
+    return (first[0] + sign * second[0]) % 4, first[1] ^ second[1]
+
+
+def inverse(transform):
+    """Return the transformation undoing transform."""
+    rotations, flipped = transform
+    # Every flip is its own inverse
+    return transform if flipped else (-rotations % 4, 0)
+
 
+def get_orientation(path):
+    """Return the transformation needed to show an image upright."""
+    return ORIENTATIONS.get(exif.get_tags(path).get(exif.ORIENTATION),
+                            IDENTITY)
+
+
+def transpose(im, transform):
+    """Return a PIL image transformed by transform."""
+    if transform == IDENTITY:
+        return im
+    return im.transpose(PIL_TRANSPOSITIONS[transform])
+
+
+def _write_orientation(path, exif_data, orientation):
+    with open(path, "r+b") as f:
+        f.seek(exif_data.orientation_offset)
+        f.write(struct.pack(exif_data.byte_order + "H", orientation))
+    exif.uncache(path)
+
+
+def _reset_orientation(path):
+    """Set the orientation tag to 1 after the pixels were transformed."""
+    exif_data = exif.read_exif(path)
+    if exif_data.orientation_offset is not None \
+            and exif_data.tags.get(exif.ORIENTATION) != 1:
+        _write_orientation(path, exif_data, 1)
+
+
+def _transform_with_jpegtran(path, transform):
+    """Transform a JPEG in the DCT domain without any loss of quality.
+
+    Return:
+        True if the file was transformed.
+    """
+    if get_format(path) != "jpeg" or not which("jpegtran"):
+        return False
+    try:
+        fd, tmpfile = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(fd)
+    except OSError:
+        return False
+    # -perfect fails instead of dropping partial blocks at the edges
+    cmd = ["jpegtran", "-copy", "all", "-perfect"] + \
+        JPEGTRAN_ARGS[transform] + ["-outfile", tmpfile, path]
+    p = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+    p.communicate()
+    if p.returncode:
+        os.remove(tmpfile)
+        return False
+    copymode(path, tmpfile)
+    _reset_orientation(tmpfile)
+    os.replace(tmpfile, path)
+    exif.uncache(path)
+    return True
+
+
+def _transform_with_pil(path, transform):
+    with Image.open(path) as im:
+        fmt = im.format
+        im = transpose(im, transform)
+        save_image(im, path, fmt)
+    _reset_orientation(path)
+    exif.uncache(path)
+
+
+def transform_file(path, transform, method="auto"):
+    """Rotate and flip an image file as losslessly as possible.
+
+    JPEGs are transformed using jpegtran. If this is not possible only the
+    exif orientation tag is changed. All other images are decoded and saved
+    again using PIL.
+
+    Args:
+        path: Path to the image.
+        transform: Transformation to apply to the image as it is shown.
+        method: One of auto, jpegtran, exif and PIL.
+    Return:
+        The method used or None if nothing had to be done.
+    """
+    # Always work on realpath, not on symlink
+    path = os.path.realpath(path)
+    if transform == IDENTITY:
+        return None
+    exif_data = exif.get_exif(path)
+    orientation = ORIENTATIONS.get(exif_data.tags.get(exif.ORIENTATION),
+                                   IDENTITY)
+    # The image is shown with its orientation applied
+    total = compose(orientation, transform)
+    if method in ["auto", "jpegtran"] \
+            and _transform_with_jpegtran(path, total):
+        return "jpegtran"
+    if method in ["auto", "exif"] \
+            and exif_data.orientation_offset is not None:
+        _write_orientation(path, exif_data, ORIENTATION_TAGS[total])
+        return "exif"
+    _transform_with_pil(path, total)
+    return "PIL"
 
-def rotate_file(filelist, cwise):
+
+def rotate_file(filelist, cwise, method="auto"):
     """Rotate every image in filelist cwise*90° counterclockwise.
 
     Args:
         filelist: List of files to operate on.
         cwise: Rotation amount. Rotation is cwise*90° counterclockwise.
+        method: Method passed to transform_file.
     """
-    # Always work on realpath, not on symlink
-    filelist = [os.path.realpath(image) for image in filelist]
     for image in filelist:
-        with Image.open(image) as im:
-            if cwise == 1:
-                im = im.transpose(Image.ROTATE_90)
-            elif cwise == 2:
-                im = im.transpose(Image.ROTATE_180)
-            elif cwise == 3:
-                im = im.transpose(Image.ROTATE_270)
-            save_image(im, image)
+        transform_file(image, rotation(cwise), method)
 
 
-def flip_file(filelist, horizontal):
+def flip_file(filelist, horizontal, method="auto"):
     """Flip every image in the correct direction.
 
     Args:
         filelist: List of files to operate on.
         horizontal: If True, flip horizontally. Else flip vertically.
+        method: Method passed to transform_file.
     """
-    # Always work on realpath, not on symlink
-    filelist = [os.path.realpath(image) for image in filelist]
     for image in filelist:
-        with Image.open(image) as im:
-            if horizontal:
-                im = im.transpose(Image.FLIP_LEFT_RIGHT)
-            else:
-                im = im.transpose(Image.FLIP_TOP_BOTTOM)
-            save_image(im, image)
+        transform_file(image, flip(horizontal), method)
+
+
+def _to_8bit(im):
+    """Return 16 bit grey images scaled to mode L before enhancing them.
+
+    Converting them directly clips all values above 255.
+    """
+    if im.mode in GREY_16:
+        return im.convert("I").point(lambda value: value / 257 + 0.5) \
+            .convert("L")
+    return im
+
+
+def _restore_mode(im, mode):
+    """Return an enhanced image in the mode of the original where possible.
+
+    Enhancing returns RGB or RGBA images. Grey images stay grey, so they are
+    converted back without any loss, 16 bit ones at 8 bit precision. All other
+    images, e.g. with a palette, are kept in RGB or RGBA. Info which depends on
+    the mode is dropped if the mode changed.
+
+    Args:
+        im: The enhanced PIL image.
+        mode: Mode of the original image.
+    """
+    info = im.info
+    grey = mode in ["1", "L", "LA"] + GREY_16
+    if grey and im.mode == "RGBA":
+        im = im.convert("LA")
+    elif grey:
+        im = im.convert("L")
+        if mode in GREY_16:
+            im = im.convert("I").point(lambda value: value * 257)
+            if mode != "I":
+                im = im.convert(mode)
+    im.info = {key: value for key, value in info.items()
+               if im.mode == mode or key not in MODE_INFO}
+    return im
+
+
+def _backup(path, backup):
+    """Copy an image to backup before it is rewritten if backup is given."""
+    if backup:
+        copy2(path, backup)
+
+
+def enhance_file(path, manipulations, backup=None):
+    """Apply brightness, contrast and sharpness to an image file.
+
+    Args:
+        path: Path to the image.
+        manipulations: Dictionary of the bri, con and sha factors.
+        backup: Path to copy the image to first or None.
+    """
+    _backup(path, backup)
+    with Image.open(path) as im:
+        # Keeps the exif data of the original file
+        enhanced = enhance.enhance_strips(_to_8bit(im), manipulations)
+        enhanced.info = im.info
+        enhanced = _restore_mode(enhanced, im.mode)
+        save_image(enhanced, path, im.format)
+    exif.uncache(path)
+
+
+def apply_operations(im, operations):
+    """Return a PIL image with a list of edits applied.
+
+    Args:
+        im: Upright PIL image to act on.
+        operations: List of edits as stored by editstack.
+    Return:
+        The edited image in mode RGB or RGBA if it was enhanced.
+    """
+    for name, value in operations:
+        if name == "transform":
+            im = transpose(im, value)
+        else:
+            im = enhance.enhance_strips(im, value)
+    return im
+
+
+def export_file(path, operations, backup=None):
+    """Write a list of edits into an image file.
+
+    Only rotating and flipping is done as losslessly as transform_file does,
+    otherwise the image is decoded and saved once for all edits.
+
+    Args:
+        path: Path to the image.
+        operations: List of edits as stored by editstack.
+        backup: Path to copy the image to first or None.
+    """
+    path = os.path.realpath(path)
+    _backup(path, backup)
+    if all(name == "transform" for name, _ in operations):
+        transform = IDENTITY
+        for _, value in operations:
+            transform = compose(transform, value)
+        transform_file(path, transform)
+        return
+    with Image.open(path) as im:
+        info = im.info
+        fmt = im.format
+        mode = im.mode
+        im = transpose(_to_8bit(im), get_orientation(path))
+        im = apply_operations(im, operations)
+        im.info = info  # Keeps the exif data of the original file
+        im = _restore_mode(im, mode)
+        save_image(im, path, fmt)
+    _reset_orientation(path)
+    exif.uncache(path)
+
+
+def autorotate_file(path):
+    """Rotate an image according to its exif orientation.
+
+    JPEGs are rotated losslessly if possible, the orientation tag is set to 1.
+
+    Args:
+        path: Path to the image.
+    Return:
+        True if the image was rotated.
+    """
+    path = os.path.realpath(path)
+    orientation = get_orientation(path)
+    if orientation == IDENTITY:
+        return False
+    if not _transform_with_jpegtran(path, orientation):
+        _transform_with_pil(path, orientation)
+    return True
 
 
 def autorotate(filelist, method="auto"):
@@ -82,28 +381,14 @@ def autorotate(filelist, method="auto"):
         # Added to the message displayed when done
         method = "jhead"
     elif method == "PIL":
+        # Only open the images which actually need to be rotated
+        exif_data = exif.get_exif_many(filelist)
         for path in filelist:
-            with Image.open(path) as im:
-                exif = im._getexif()
-                orientation_key = 274  # cf ExifTags
-                rotated = True
-
-                # Only do something if orientation info is there
-                if exif and orientation_key in exif:
-                    orientation = exif[orientation_key]
-                    # Rotate and save the image
-                    if orientation == 3:
-                        im = im.transpose(Image.ROTATE_180)
-                    elif orientation == 6:
-                        im = im.transpose(Image.ROTATE_270)
-                    elif orientation == 8:
-                        im = im.transpose(Image.ROTATE_90)
-                    else:
-                        rotated = False
-                    if rotated:
-                        save_image(im, path)
-                        rotated_images += 1
-            method = "PIL"
+            orientation = exif_data[path].tags.get(exif.ORIENTATION)
+            if orientation in ORIENTATIONS and orientation != 1:
+                _transform_with_pil(os.path.realpath(path),
+                                    ORIENTATIONS[orientation])
+                rotated_images += 1
 
     # Return the amount of rotated images and the method used
     return rotated_images, method
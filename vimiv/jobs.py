@@ -0,0 +1,297 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Run jobs modifying image files in a pool of worker processes.
+
+All work modifying files goes through one JobRunner, so a file is never
+modified by two jobs at once.
+"""
+
+import multiprocessing
+import os
+from collections import OrderedDict
+from threading import Condition, Lock
+
+from gi.repository import GLib
+
+
+def _run_job(job):
+    """Run one job in a worker process.
+
+    Args:
+        job: Tuple of function, path and further arguments. The function is
+            called as function(path, *args).
+    Return:
+        Tuple of the path, the return value of the function and an error
+        message or None.
+    """
+    function, path, args = job
+    try:
+        return path, function(path, *args), None
+    except Exception as e:  # pylint: disable=broad-except
+        # Report the error of this file and continue with the others
+        return path, None, str(e)
+
+
+class Batch(object):
+    """Jobs started together.
+
+    Attributes:
+        description: Verb describing the jobs shown in the statusbar.
+        on_file: Function called with the path and the result of every file
+            that was processed successfully or None.
+        callback: Function called with the batch once all its jobs are done or
+            None.
+        remaining: Number of jobs which did not finish yet.
+        results: Dictionary of the results of all successful jobs by path.
+        errors: List of tuples of path and error message of all failed jobs.
+    """
+
+    def __init__(self, description, amount, on_file=None, callback=None):
+        self.description = description
+        self.on_file = on_file
+        self.callback = callback
+        self.remaining = amount
+        self.results = {}
+        self.errors = []
+
+
+class JobRunner(object):
+    """Run file modifying functions on many images in parallel.
+
+    At most max_running jobs are handed to the pool at once, the others wait
+    in a queue so they can still be cancelled. Jobs of a file are run in the
+    order they were started, one at a time. A new job is merged with the last
+    job waiting for its file if both run the same function and a merge
+    function is given. Results are reported back to the main loop using
+    GLib.idle_add.
+
+    Attributes:
+        app: The main vimiv application to interact with.
+        queue: OrderedDict of waiting jobs. Keys are tuples of function, path
+            and a running number, values lists of args and the batches the
+            job belongs to.
+        running: Number of jobs currently run by the pool.
+        total: Number of jobs started since the runner was last idle.
+        done: Number of these jobs which are finished.
+        description: Description of the last batch shown in the statusbar.
+        max_running: Maximum number of jobs handed to the pool at once.
+
+        _pool: multiprocessing.Pool created once it is needed.
+        _active: Set of paths which are currently being modified.
+        _last: Dictionary of the key of the last waiting job by path.
+        _count: Number of jobs queued so far used to create unique keys.
+        _lock: Lock guarding queue, running and _active.
+        _finished: Condition notified once no jobs are left.
+    """
+
+    _processes = os.cpu_count() or 1
+    # Seconds close waits for all jobs before dropping the ones not started
+    close_timeout = 30
+
+    def __init__(self, app):
+        """Set default values.
+
+        Args:
+            app: The main vimiv application to interact with.
+        """
+        self.app = app
+        self.queue = OrderedDict()
+        self.running = 0
+        self.total = 0
+        self.done = 0
+        self.description = ""
+        self.max_running = 2 * self._processes
+        self._pool = None
+        self._active = set()
+        self._last = {}
+        self._count = 0
+        self._lock = Lock()
+        self._finished = Condition(self._lock)
+
+    def run(self, function, jobs, description, on_file=None, callback=None,
+            merge=None):
+        """Run function on many files in the background.
+
+        Args:
+            function: Module level function called as function(path, *args)
+                in a worker process.
+            jobs: List of tuples of path and args.
+            description: Verb describing the jobs shown in the statusbar.
+            on_file: Function called with path and result of every file that
+                was processed successfully.
+            callback: Function called with the Batch once all jobs are done.
+            merge: Function called with the args of the last waiting job of a
+                file and the new args returning the args to run the job with.
+                If None the new job is queued separately, as running it only
+                once could lose work, e.g. when exporting different edits.
+        """
+        if not jobs:
+            return
+        batch = Batch(description, len(jobs), on_file, callback)
+        if self._pool is None:
+            # Forking a process running Gtk is not safe
+            context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(self._processes)
+        self.total += len(jobs)
+        self.description = description
+        with self._lock:
+            for path, args in jobs:
+                key = self._last.get(path)
+                # Merging with an earlier job would run it before later jobs
+                # of other functions
+                if merge and key is not None and key[0] == function:
+                    waiting_args, batches = self.queue[key]
+                    args = merge(waiting_args, args)
+                    self.queue[key] = [args, batches + [batch]]
+                else:
+                    self._count += 1
+                    key = (function, path, self._count)
+                    self.queue[key] = [args, [batch]]
+                    self._last[path] = key
+        self._start_jobs()
+        self._update_progress()
+
+    def cancel(self):
+        """Cancel all jobs which were not started yet."""
+        with self._lock:
+            cancelled = list(self.queue.items())
+            self.queue.clear()
+            self._last.clear()
+        if not cancelled:
+            self.app["statusbar"].message("No waiting jobs to cancel", "info")
+            return
+        for (_, path, _), (_, batches) in cancelled:
+            for batch in batches:
+                batch.errors.append((path, "Cancelled"))
+                self._job_done(batch)
+        self.app["statusbar"].message(
+            "Cancelled %d job(s)" % (len(cancelled)), "info")
+
+    def has_jobs(self, path):
+        """Return True if a file is being modified or waits to be."""
+        with self._lock:
+            return path in self._active or path in self._last
+
+    def is_running(self):
+        """Return True if there are unfinished jobs."""
+        return self.done < self.total
+
+    def get_progress(self):
+        """Return a string describing the progress for the statusbar."""
+        if not self.is_running():
+            return ""
+        return "[%s %d/%d]" % (self.description, self.done, self.total)
+
+    def close(self):
+        """Wait until all jobs are done and stop the worker processes.
+
+        The main loop is blocked meanwhile, so results are not reported.
+        Jobs which did not start after close_timeout are cancelled. Running
+        jobs are never terminated as they could be writing a file.
+        """
+        if self._pool is None:
+            return
+        if not self._wait(self.close_timeout):
+            self.cancel()
+            self._wait()
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
+
+    def _wait(self, timeout=None):
+        """Wait until all jobs are done, return False on timeout."""
+        with self._lock:
+            return self._finished.wait_for(
+                lambda: not self.queue and not self.running, timeout)
+
+    def _start_jobs(self):
+        """Hand waiting jobs to the pool until max_running are running.
+
+        This is called from the main thread and from the result handler
+        thread of the pool.
+        """
+        with self._lock:
+            startable = []
+            for key in self.queue:
+                if len(startable) + self.running >= self.max_running:
+                    break
+                if key[1] not in self._active:
+                    startable.append(key)
+                    self._active.add(key[1])
+            for key in startable:
+                function, path, _ = key
+                args, batches = self.queue.pop(key)
+                if self._last.get(path) == key:
+                    del self._last[path]
+                self.running += 1
+                self._pool.apply_async(
+                    _run_job, ((function, path, args),),
+                    callback=lambda result, batches=batches:
+                    self._on_result(batches, result),
+                    error_callback=lambda error, path=path, batches=batches:
+                    self._on_result(batches, (path, None, str(error) or
+                                              type(error).__name__)))
+
+    def _on_result(self, batches, result):
+        """Start the next jobs and report the result to the main loop."""
+        with self._lock:
+            self.running -= 1
+            self._active.discard(result[0])
+        self._start_jobs()
+        with self._lock:
+            if not self.queue and not self.running:
+                self._finished.notify_all()
+        GLib.idle_add(self._report, batches, *result)
+
+    def _report(self, batches, path, result, error):
+        """Store the result of a job and update the widgets.
+
+        Args:
+            batches: List of batches the job belongs to.
+            path: Path of the file the job processed.
+            result: Return value of the function.
+            error: Error message if the job failed, else None.
+        """
+        # Merged jobs of different batches usually share on_file
+        handlers = []
+        for batch in batches:
+            if error is None:
+                batch.results[path] = result
+                if batch.on_file and batch.on_file not in handlers:
+                    handlers.append(batch.on_file)
+            else:
+                batch.errors.append((path, error))
+        for on_file in handlers:
+            on_file(path, result)
+        for batch in batches:
+            self._job_done(batch)
+        return False  # Only run once
+
+    def _job_done(self, batch):
+        self.done += 1
+        batch.remaining -= 1
+        if not batch.remaining:
+            self._finish(batch)
+        if not self.is_running():
+            self.total = self.done = 0
+        self._update_progress()
+
+    def _finish(self, batch):
+        """Run the callback of a finished batch and report its errors."""
+        if batch.callback:
+            batch.callback(batch)
+        failed = [(path, error) for path, error in batch.errors
+                  if error != "Cancelled"]
+        for path, error in failed:
+            self.app["log"].write_message(batch.description,
+                                          "%s: %s" % (path, error))
+        if failed:
+            names = ", ".join(os.path.basename(path) for path, _ in failed[:3])
+            if len(failed) > 3:
+                names += ", ..."
+            self.app["statusbar"].message(
+                "%s failed for %d image(s): %s" %
+                (batch.description, len(failed), names), "error")
+
+    def _update_progress(self):
+        statusbar = self.app["statusbar"]
+        statusbar.set_center_status(statusbar.get_mode())
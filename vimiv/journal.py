@@ -0,0 +1,288 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Journal of file modifying operations which can be undone and redone.
+
+Every operation is one entry of the journal made of one step per file. Steps
+store the inverse operation where possible and a backup of the file otherwise:
+
+    ("transform", path, transform): The file was rotated and flipped. Undone by
+        the inverse transformation.
+    ("stack", path, before, after): The edit stack of the file changed from the
+        list of edits before to after.
+    ("rewrite", path, function, args, backup): The file was rewritten by
+        function(path, *args, backup) which copied it to backup first. Undone
+        by copying the backup back.
+    ("move", src, dest): The file was moved or renamed.
+
+Backups are kept until vimiv quits. The oldest entries are dropped once the
+backups need more space than the budget. Backups left behind by instances
+which did not quit cleanly are removed on startup.
+"""
+
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from vimiv import editstack, exif, imageactions
+
+
+def restore_backup(path, backup):
+    """Copy a backup over an image.
+
+    Args:
+        path: Path to the image.
+        backup: Path to the backup of the image.
+    """
+    path = os.path.realpath(path)
+    # Replace the image at once so it is never left half written
+    fd, tmpfile = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".",
+                                   dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        shutil.copy2(backup, tmpfile)
+        os.replace(tmpfile, path)
+    except BaseException:
+        os.remove(tmpfile)
+        raise
+    exif.uncache(path)
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # The process exists but belongs to another user
+    return True
+
+
+def _merge_transforms(waiting, new):
+    return (imageactions.compose(waiting[0], new[0]),)
+
+
+class Journal(object):
+    """Undo and redo rotating, flipping, enhancing, deleting and renaming.
+
+    Attributes:
+        app: The main vimiv application to interact with.
+        budget: Maximum size of all backups in bytes.
+        undo_stack: List of entries which can be undone, the latest last.
+            Entries are tuples of a description and a list of steps.
+        redo_stack: List of undone entries which can be redone.
+        used: Size reserved for all backups in bytes.
+
+        _directory: Directory containing the backups, created once needed.
+        _sizes: Dictionary of the size reserved for every backup.
+    """
+
+    def __init__(self, app, settings):
+        """Set default values.
+
+        Args:
+            app: The main vimiv application to interact with.
+            settings: Settings from configfiles to use.
+        """
+        self.app = app
+        self.budget = settings["GENERAL"]["undo_budget"] * 1024 * 1024
+        self.undo_stack = []
+        self.redo_stack = []
+        self.used = 0
+        self._directory = None
+        self._sizes = {}
+        self._remove_leftovers()
+
+    def record(self, description, steps):
+        """Add an operation to the journal.
+
+        Operations which were undone cannot be redone afterwards.
+
+        Args:
+            description: Noun describing the operation shown when undoing it.
+            steps: List of steps of the operation.
+        """
+        if not steps:
+            return
+        self._drop(self.redo_stack, len(self.redo_stack))
+        self.undo_stack.append((description, steps))
+
+    def get_backups(self, paths):
+        """Return paths to back up images to before rewriting them.
+
+        The oldest entries are dropped until the backups fit into the budget.
+
+        Args:
+            paths: List of images which are rewritten.
+        Return:
+            List of backup paths or None if the backups do not fit into the
+            budget at all. The journal is empty then, older entries could
+            undo the rewritten images only partially. Images which cannot be
+            read, e.g. as they were removed, get None instead of a backup.
+        """
+        sizes = []
+        for path in paths:
+            try:
+                sizes.append(os.path.getsize(path))
+            except OSError:
+                sizes.append(None)
+        total = sum(size for size in sizes if size is not None)
+        self._drop(self.redo_stack, len(self.redo_stack))
+        while self.undo_stack and self.used + total > self.budget:
+            self._drop(self.undo_stack, 1)
+        if self.used + total > self.budget:
+            return None
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(
+                prefix="journal-%d-" % (os.getpid()), dir=self.app.directory)
+        backups = []
+        for path, size in zip(paths, sizes):
+            if size is None:
+                backups.append(None)
+                continue
+            fd, backup = tempfile.mkstemp(
+                suffix="_" + os.path.basename(path), dir=self._directory)
+            os.close(fd)
+            self._sizes[backup] = size
+            self.used += size
+            backups.append(backup)
+        return backups
+
+    def undo(self):
+        """Undo the latest operation."""
+        # Rotations and flips of the image shown are still pending
+        self.app["manipulate"].run_simple_manipulations()
+        if not self._can_run(self.undo_stack, "undo"):
+            return
+        description, steps = self.undo_stack[-1]
+        if not self._can_move(steps, True):
+            return
+        self.redo_stack.append(self.undo_stack.pop())
+        self._run(reversed(steps), True)
+        self.app["statusbar"].message(
+            "Undid %s of %d file(s)" % (description, len(steps)), "info")
+
+    def redo(self):
+        """Redo the latest operation that was undone."""
+        if not self._can_run(self.redo_stack, "redo"):
+            return
+        description, steps = self.redo_stack[-1]
+        if not self._can_move(steps, False):
+            return
+        self.undo_stack.append(self.redo_stack.pop())
+        self._run(steps, False)
+        self.app["statusbar"].message(
+            "Redid %s of %d file(s)" % (description, len(steps)), "info")
+
+    def close(self):
+        """Remove all backups."""
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        self.undo_stack = []
+        self.redo_stack = []
+        self._sizes = {}
+        self.used = 0
+
+    def _can_run(self, stack, name):
+        if self.app["manipulate"].scrolled_win.is_visible():
+            self.app["statusbar"].message(
+                "Leave manipulate to %s" % (name), "warning")
+            return False
+        elif not stack:
+            self.app["statusbar"].message("Nothing to %s" % (name), "info")
+            return False
+        return True
+
+    def _can_move(self, steps, undo):
+        """Return True if all files of an entry can be moved back or again.
+
+        The moves are checked in the order they run as earlier moves free and
+        fill paths, e.g. when a file was moved to the name of another one.
+        """
+        freed = set()
+        filled = set()
+        for step in reversed(steps) if undo else steps:
+            if step[0] != "move":
+                continue
+            src, dest = (step[2], step[1]) if undo else (step[1], step[2])
+            if self.app["jobs"].has_jobs(src):
+                message = "%s is still being modified" % (src)
+            elif src in freed \
+                    or (src not in filled and not os.path.exists(src)):
+                message = "%s does not exist anymore" % (src)
+            elif dest in filled \
+                    or (dest not in freed and os.path.exists(dest)):
+                message = "%s exists already" % (dest)
+            else:
+                freed.discard(dest)
+                filled.discard(src)
+                freed.add(src)
+                filled.add(dest)
+                continue
+            self.app["statusbar"].message(message, "error")
+            return False
+        return True
+
+    def _run(self, steps, undo):
+        """Run the steps of an entry, their inverse if undo is True.
+
+        Files are modified by the job runner which keeps the order of the jobs
+        of every file.
+        """
+        manipulate = self.app["manipulate"]
+        jobs = OrderedDict()
+        moved = False
+        for step in steps:
+            kind, path = step[:2]
+            if kind == "transform":
+                transform = imageactions.inverse(step[2]) if undo else step[2]
+                jobs.setdefault(imageactions.transform_file, []).append(
+                    (path, (transform,)))
+            elif kind == "stack":
+                editstack.save(path, step[2] if undo else step[3])
+                manipulate.on_file_modified(path)
+            elif kind == "rewrite":
+                _, _, function, args, backup = step
+                if undo:
+                    jobs.setdefault(restore_backup, []).append(
+                        (path, (backup,)))
+                else:
+                    jobs.setdefault(function, []).append(
+                        (path, args + (backup,)))
+            else:
+                src, dest = (step[2], path) if undo else (path, step[2])
+                editstack.move(src, dest)
+                shutil.move(src, dest)
+                moved = True
+        description = "Undoing" if undo else "Redoing"
+        for function, function_jobs in jobs.items():
+            merge = _merge_transforms \
+                if function is imageactions.transform_file else None
+            self.app["jobs"].run(function, function_jobs, description,
+                                 on_file=manipulate.on_file_modified,
+                                 merge=merge)
+        if moved:
+            self.app["fileextras"].reload_changes(os.getcwd(), True)
+
+    def _remove_leftovers(self):
+        """Remove the backups of instances which are not running anymore."""
+        if not os.path.isdir(self.app.directory):
+            return
+        for name in os.listdir(self.app.directory):
+            if not name.startswith("journal-"):
+                continue
+            pid = name.split("-")[1]
+            if not pid.isdigit() or not _is_running(int(pid)):
+                shutil.rmtree(os.path.join(self.app.directory, name),
+                              ignore_errors=True)
+
+    def _drop(self, stack, amount):
+        """Remove the first amount entries of stack and their backups."""
+        for _, steps in stack[:amount]:
+            for step in steps:
+                if step[0] == "rewrite":
+                    backup = step[4]
+                    self.used -= self._sizes.pop(backup, 0)
+                    if os.path.exists(backup):
+                        os.remove(backup)
+        del stack[:amount]
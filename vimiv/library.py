@@ -2,10 +2,14 @@
 """Library part of self.app."""
 
 import os
+from bisect import bisect
+from multiprocessing.pool import ThreadPool as Pool
 
-from gi.repository import Gdk, Gtk
+from gi.repository import Gdk, GLib, Gtk
 from vimiv.fileactions import is_image, populate
-from vimiv.helpers import listdir_wrapper, sizeof_fmt
+from vimiv.helpers import PathList, listdir_wrapper, sizeof_fmt
+from vimiv.snapshot import DirectoryCache
+from vimiv.sorting import natural_key
 
 
 class Library(object):
@@ -27,8 +31,12 @@ class Library(object):
             amount of images in it.
         desktop_start_dir: Directory to start in if launched from desktop.
         tilde_in_statusbar: If True, collapse $HOME to ~ in statusbar.
-        files: Files in the library.
+        files: PathList of files in the library.
         filesize: Dictionary storing the size of files.
+        snapshot: DirectorySnapshot of the current directory.
+        dircache: DirectoryCache of recently visited directories.
+        generation: Counter increased for every new listing. Image counts of
+            subdirectories belonging to an older listing are dropped.
         grid: Gtk.Grid containing the TreeView and the border.
         scrollable_treeview: Gtk.ScrolledWindow in which the TreeView gets
             packed.
@@ -36,6 +44,9 @@ class Library(object):
             number, filename, filesize and is_marked.
     """
 
+    _thread_pool = Pool(1)
+    count_placeholder = "..."
+
     def __init__(self, app, settings):
         """Create the necessary objects and settings.
 
@@ -60,8 +71,12 @@ class Library(object):
         self.tilde_in_statusbar = library["tilde_in_statusbar"]
 
         # Defaults
-        self.files = []
+        self.files = PathList()
         self.filesize = {}
+        self.snapshot = None
+        self.dircache = DirectoryCache(self.on_directory_changed,
+                                       ignore=self.is_being_modified)
+        self.generation = 0
 
         # Grid with treeview and border
         self.grid = Gtk.Grid()
@@ -169,28 +184,46 @@ class Library(object):
         liststore = Gtk.ListStore(int, str, str, str)
         self.files = self.filelist_create()
         # Remove unsupported files if one isn't in the tags directory
-        if os.getcwd() != self.app["tags"].directory:
-            self.files = [
+        if self.snapshot.directory != self.app["tags"].directory:
+            self.files = PathList(
                 possible_file
                 for possible_file in self.files
-                if is_image(possible_file) or os.path.isdir(possible_file)]
+                if self.snapshot[possible_file].is_image
+                or self.snapshot[possible_file].is_dir)
         # Add all supported files
         for i, fil in enumerate(self.files):
-            markup_string = fil
             size = self.filesize[fil]
-            marked_string = ""
-            if os.path.islink(fil):
-                markup_string += "  →  " + os.path.realpath(fil)
-            if os.path.abspath(fil) in self.app["mark"].marked:
-                marked_string = "[*]"
-            if os.path.isdir(fil):
-                markup_string = "<b>" + markup_string + "</b>"
-            if i in self.app["commandline"].search_positions:
-                markup_string = self.markup + markup_string + "</span>"
-            liststore.append([i + 1, markup_string, size, marked_string])
+            marked_string = "[*]" if self.is_marked(fil) else ""
+            liststore.append([i + 1, self.get_markup(i, fil), size,
+                              marked_string])
 
         return liststore
 
+    def get_markup(self, position, name):
+        """Return the markup string of a file in the library.
+
+        Args:
+            position: Position of the file in the library.
+            name: Name of the file.
+        """
+        entry = self.snapshot[name]
+        markup_string = name
+        if entry.is_link:
+            markup_string += "  →  " + entry.target
+        if entry.is_dir:
+            markup_string = "<b>" + markup_string + "</b>"
+        if position in self.app["commandline"].search_positions:
+            markup_string = self.markup + markup_string + "</span>"
+        return markup_string
+
+    def is_marked(self, name):
+        """Return True if the file called name is marked."""
+        return self.snapshot.get_path(name) in self.app["mark"].marked
+
+    def is_directory(self, name):
+        """Return True if the file called name is a directory."""
+        return self.snapshot[name].is_dir
+
     def file_select(self, treeview, path, column, close):
         """Show image or open directory for activated file in library.
 
@@ -215,7 +248,7 @@ class Library(object):
             self.app["tags"].load(fil)
             return
         # Rest
-        if os.path.isdir(fil):  # Open the directory
+        if self.is_directory(fil):  # Open the directory
             self.move_up(fil)
         else:  # Focus the image and populate a new list from the dir
             # If thumbnail toggled, go out
@@ -224,13 +257,12 @@ class Library(object):
                 self.treeview.grab_focus()
             if self.app.paths and fil in self.app.paths[self.app.index]:
                 close = True  # Close if file selected twice
-            index = 0  # Catch directories to focus correctly
-            for f in self.files:
-                if f == fil:
-                    break
-                elif os.path.isfile(f):
-                    index += 1
-            self.app.paths, self.app.index = populate(self.files)
+            self.app.paths, self.app.index = populate(self.files, sort=True)
+            self.app["watcher"].watch_paths()
+            # Catch directories to focus correctly
+            abspath = os.path.abspath(fil)
+            index = self.app.paths.index(abspath) \
+                if abspath in self.app.paths else 0
             if self.app.paths:
                 self.scrollable_treeview.set_hexpand(False)
                 self.app["image"].scrolled_win.show()
@@ -300,14 +332,7 @@ class Library(object):
         """Only reload names of the treeview."""
         model = self.treeview.get_model()
         for i, name in enumerate(self.files):
-            markup_string = name
-            if os.path.islink(name):
-                markup_string += "  →  " + os.path.realpath(name)
-            if os.path.isdir(name):
-                markup_string = "<b>" + markup_string + "</b>"
-            if i in self.app["commandline"].search_positions:
-                markup_string = self.markup + markup_string + "</span>"
-            model[i][1] = markup_string
+            model[i][1] = self.get_markup(i, name)
 
     def move_pos(self, forward=True, defined_pos=None):
         """Move to a specific position in the library.
@@ -383,37 +408,142 @@ class Library(object):
 
         Args:
             directory: Directory of which the filelist is created.
+        Return:
+            PathList of files in directory.
         """
-        # Get data from ls -lh and parse it correctly
-        files = listdir_wrapper(directory, self.show_hidden)
+        # Gather all information on the files in one pass, broken symbolic
+        # links are not included
+        self.snapshot = self.dircache.get(directory, self.show_hidden)
+        self.generation += 1
+        files = PathList(self.snapshot.names)
         self.filesize = {}
         for fil in files:
-            # Catch broken symbolic links
-            if os.path.islink(fil) and \
-                    not os.path.exists(os.path.realpath(fil)):
-                continue
-            # Number of images in directory as filesize
-            if os.path.isdir(fil):
-                try:
-                    subfiles = listdir_wrapper(fil, self.show_hidden)
-                    # Necessary to keep acceptable speed in library
-                    many = False
-                    if len(subfiles) > self.file_check_amount:
-                        many = True
-                    subfiles = [subfile
-                                for subfile in subfiles[:self.file_check_amount]
-                                if is_image(os.path.join(fil, subfile))]
-                    amount = str(len(subfiles))
-                    if subfiles and many:
-                        amount += "+"
-                    self.filesize[fil] = amount
-                except PermissionError:
-                    self.filesize[fil] = "N/A"
-            else:
-                self.filesize[fil] = sizeof_fmt(os.path.getsize(fil))
+            self.add_filesize(fil)
 
         return files
 
+    def add_filesize(self, name):
+        """Add the size of a file in the current directory to filesize.
+
+        The number of images in a directory is used as its size. It is counted
+        in the background.
+
+        Args:
+            name: Name of the file.
+        """
+        if self.snapshot[name].is_dir:
+            self.filesize[name] = self.count_placeholder
+            self._thread_pool.apply_async(
+                self._count_images,
+                (self.snapshot.get_path(name), self.generation),
+                callback=self._do_callback)
+        else:
+            self.filesize[name] = sizeof_fmt(self.snapshot[name].size)
+
+    def on_directory_changed(self, directory):
+        """Refresh library and thumbnails if a monitored directory changed.
+
+        The filelist is never rebuilt here as it may come from a recursive
+        search, stdin or several arguments. Only the library rows and the
+        thumbnails of files already in the filelist are updated. New images
+        in directories watched by the watcher are added by the watcher itself.
+
+        Args:
+            directory: The directory that changed.
+        """
+        if directory == os.getcwd() and self.grid.is_visible():
+            if self.app["watcher"].is_watched(directory):
+                self.insert_new_files()
+            else:
+                self.app["fileextras"].reload_changes(directory, False)
+        if self.app["thumbnail"].toggled \
+                and any(os.path.dirname(path) == directory
+                        for path in self.app.paths):
+            self.app["thumbnail"].update_paths(self.app.paths)
+
+    def is_being_modified(self, path):
+        """Return True if a changed file is being modified by a job.
+
+        Changes of files vimiv modifies itself are shown once the job is done.
+
+        Args:
+            path: Path to the changed file.
+        """
+        return self.app["jobs"].has_jobs(path)
+
+    def insert_new_files(self):
+        """Insert rows for files created in the current directory.
+
+        Falls back to reloading the library if files were removed.
+        """
+        directory = os.getcwd()
+        snapshot = self.dircache.get(directory, self.show_hidden)
+        if any(fil not in snapshot for fil in self.files):
+            self.app["fileextras"].reload_changes(directory, False)
+            return
+        self.snapshot = snapshot
+        in_tags = directory == self.app["tags"].directory
+        new_files = [fil for fil in snapshot.names
+                     if fil not in self.files
+                     and (in_tags or snapshot[fil].is_image
+                          or snapshot[fil].is_dir)]
+        if not new_files:
+            return
+        model = self.treeview.get_model()
+        first = len(self.files)
+        keys = [natural_key(name) for name in self.files]
+        for fil in new_files:
+            key = natural_key(fil)
+            position = bisect(keys, key)
+            keys.insert(position, key)
+            first = min(first, position)
+            self.files.insert(position, fil)
+            self.add_filesize(fil)
+            marked_string = "[*]" if self.is_marked(fil) else ""
+            model.insert(position, [position + 1,
+                                    self.get_markup(position, fil),
+                                    self.filesize[fil], marked_string])
+        # Rows after the first new file moved down
+        for i in range(first, len(self.files)):
+            model[i][0] = i + 1
+
+    def _count_images(self, directory, generation):
+        # The user moved on, do not waste time on this directory
+        if generation != self.generation:
+            return None
+        try:
+            subfiles = listdir_wrapper(directory, self.show_hidden)
+            # Necessary to keep acceptable speed in library
+            many = len(subfiles) > self.file_check_amount
+            subfiles = [subfile
+                        for subfile in subfiles[:self.file_check_amount]
+                        if is_image(os.path.join(directory, subfile))]
+            amount = str(len(subfiles))
+            if subfiles and many:
+                amount += "+"
+        except OSError:  # E.g. no permission or removed in the meantime
+            amount = "N/A"
+        return os.path.basename(directory), amount, generation
+
+    def _do_callback(self, result):
+        if result is not None:
+            GLib.idle_add(self._on_images_counted, *result)
+
+    def _on_images_counted(self, name, amount, generation):
+        """Update the size column of a directory once its images are counted.
+
+        Args:
+            name: Name of the directory.
+            amount: String containing the amount of images in the directory.
+            generation: Generation of the listing the count belongs to.
+        """
+        if generation == self.generation and name in self.filesize:
+            self.filesize[name] = amount
+            if name in self.files:
+                model = self.treeview.get_model()
+                model[self.files.index(name)][2] = amount
+        return False  # Only run once
+
     def scroll(self, direction):
         """Scroll the library viewer and call file_select if necessary.
 
@@ -2,11 +2,12 @@
 """Manipulate part for vimiv."""
 
 import os
-from threading import Thread
+from multiprocessing.pool import ThreadPool as Pool
+from shutil import which
 
-from gi.repository import GdkPixbuf, GLib, Gtk
-from PIL import Image, ImageEnhance
-from vimiv import imageactions
+from gi.repository import GLib, Gtk
+from PIL import Image
+from vimiv import editstack, enhance, exif, imageactions
 from vimiv.fileactions import move_to_trash
 
 
@@ -23,9 +24,19 @@ class Manipulate(object):
         scrolled_win: Gtk.ScrolledWindow for the widgets so they are accessible
             regardless of window size.
         sliders: Dictionary containing bri, con and sha sliders.
-        running_threads: List of running threads.
+        pil_thumb: Upright PIL image at screen resolution used for previews.
+        thumb_histogram: Histogram of pil_thumb.
+        render_id: ID of the idle callback starting the next preview render.
+        render_generation: Counter increased for every preview render.
+            Superseded renders are dropped.
+        simple_manipulations: Dictionary of the pending rotations and flips
+            by file, composed into one transformation per file.
+        non_destructive: If True store edits in sidecar files instead of
+            modifying the images.
     """
 
+    _thread_pool = Pool(1)
+
     def __init__(self, app, settings):
         """Create the necessary objects and settings.
 
@@ -37,9 +48,12 @@ class Manipulate(object):
 
         # Settings
         self.simple_manipulations = {}
+        self.non_destructive = settings["GENERAL"]["non_destructive"]
         self.manipulations = {"bri": 1, "con": 1, "sha": 1}
-        self.pil_image = Image
         self.pil_thumb = Image
+        self.thumb_histogram = []
+        self.render_id = 0
+        self.render_generation = 0
 
         # A scrollable window so all tools are always accessible
         self.scrolled_win = Gtk.ScrolledWindow()
@@ -108,7 +122,10 @@ class Manipulate(object):
             if message:
                 self.app["statusbar"].message(message, "error")
                 return
-        move_to_trash(images, self.app["image"].trashdir)
+        moved = []
+        move_to_trash(images, self.app["image"].trashdir, moved)
+        self.app["journal"].record(
+            "delete", [("move", src, dest) for src, dest in moved])
 
         # Reload stuff if needed
         if self.app["library"].grid.is_visible():
@@ -144,7 +161,7 @@ class Manipulate(object):
                 images.append(self.app.paths[self.app.index])
         # Add all marked images
         else:
-            images = self.app["mark"].marked
+            images = list(self.app["mark"].marked)
             if len(images) == 1:
                 message = "%s %d marked image" % (info, len(images))
             else:
@@ -183,12 +200,8 @@ class Manipulate(object):
                             self.app["image"].fit_image)
                 self.app["image"].update(False, False)
             if rotate_file:
-                for fil in images:
-                    if fil in self.simple_manipulations:
-                        self.simple_manipulations[fil][0] = \
-                            (self.simple_manipulations[fil][0] + cwise) % 4
-                    else:
-                        self.simple_manipulations[fil] = [cwise, 0, 0]
+                self.add_simple_manipulation(images,
+                                             imageactions.rotation(cwise))
                 # Reload thumbnails of rotated images immediately
                 if self.app["thumbnail"].toggled:
                     self.run_simple_manipulations()
@@ -196,26 +209,73 @@ class Manipulate(object):
             self.app["statusbar"].message(
                 "Argument for rotate must be of type integer", "error")
 
+    def add_simple_manipulation(self, images, transform):
+        """Compose a rotation or flip with the pending ones of every image.
+
+        Args:
+            images: List of images to transform.
+            transform: Transformation as created by imageactions.
+        """
+        for fil in images:
+            pending = self.simple_manipulations.get(fil, imageactions.IDENTITY)
+            self.simple_manipulations[fil] = \
+                imageactions.compose(pending, transform)
+
+    def is_non_destructive(self, path):
+        """Return True if edits of an image go to its edit stack.
+
+        Images which already have non-destructive edits are always edited
+        non-destructively until they are exported.
+        """
+        return self.non_destructive or editstack.has_edits(path)
+
     def run_simple_manipulations(self):
-        """Start thread for rotate and flip."""
-        t = Thread(target=self.thread_for_simple_manipulations)
-        t.start()
-
-    def thread_for_simple_manipulations(self):
-        """Rotate and flip image file in an extra thread."""
-        to_remove = list(self.simple_manipulations.keys())
-        for f in self.simple_manipulations:
-            if self.simple_manipulations[f][0]:
-                imageactions.rotate_file([f],
-                                         self.simple_manipulations[f][0])
-            if self.simple_manipulations[f][1]:
-                imageactions.flip_file([f], True)
-            if self.simple_manipulations[f][2]:
-                imageactions.flip_file([f], False)
-            if self.app["thumbnail"].toggled:
-                self.app["thumbnail"].reload(f)
-        for key in to_remove:
-            del self.simple_manipulations[key]
+        """Rotate and flip the files in the background using the job runner.
+
+        A transformation still waiting for a file is composed with the new one.
+        Edited non-destructively, the transformations are only stored.
+        """
+        jobs = []
+        steps = []
+        for path, transform in self.simple_manipulations.items():
+            if transform == imageactions.IDENTITY:
+                continue
+            if self.is_non_destructive(path):
+                steps.append(self.push_edit(path, ("transform", transform)))
+                self.reload_thumbnail(path)
+            else:
+                jobs.append((path, (transform,)))
+                steps.append(("transform", path, transform))
+        self.simple_manipulations = {}
+        self.app["journal"].record("rotate and flip", steps)
+        self.app["jobs"].run(
+            imageactions.transform_file, jobs, "Transforming",
+            on_file=self.reload_thumbnail,
+            merge=lambda waiting, new: (imageactions.compose(waiting[0],
+                                                             new[0]),))
+
+    def push_edit(self, path, operation):
+        """Add an edit to the edit stack of an image.
+
+        Args:
+            path: Path to the image.
+            operation: Edit to add.
+        Return:
+            Step to record in the journal.
+        """
+        before = editstack.load(path)
+        editstack.push(path, operation)
+        return "stack", path, before, editstack.load(path)
+
+    def reload_thumbnail(self, path, *args):
+        """Reload the thumbnail of a file that was modified.
+
+        Args:
+            path: Path to the file.
+            args: Further arguments passed by the job runner, ignored.
+        """
+        if self.app["thumbnail"].toggled and path in self.app.paths:
+            self.app["thumbnail"].reload(path)
 
     def flip(self, horizontal, flip_file=True):
         """Flip the displayed image and call thread to flip files.
@@ -242,15 +302,8 @@ class Manipulate(object):
                     self.app["image"].pixbuf_original.flip(horizontal)
                 self.app["image"].update(False)
             if flip_file:
-                for fil in images:
-                    if fil not in self.simple_manipulations:
-                        self.simple_manipulations[fil] = [0, 0, 0]
-                    if horizontal:
-                        self.simple_manipulations[fil][1] = \
-                            (self.simple_manipulations[fil][1] + 1) % 2
-                    else:
-                        self.simple_manipulations[fil][2] = \
-                            (self.simple_manipulations[fil][2] + 1) % 2
+                self.add_simple_manipulation(images,
+                                             imageactions.flip(horizontal))
                 # Reload thumbnails of flipped images immediately
                 if self.app["thumbnail"].toggled:
                     self.run_simple_manipulations()
@@ -259,15 +312,85 @@ class Manipulate(object):
                 "Argument for flip must be of type integer", "error")
 
     def rotate_auto(self):
-        """Autorotate all pictures in the current pathlist."""
-        amount, method = imageactions.autorotate(self.app.paths)
+        """Autorotate all pictures in the current pathlist.
+
+        jhead rotates all images in one process. Without it the images which
+        need rotating are rotated in parallel by the job runner.
+        """
+        if which("jhead"):
+            self.show_autorotated(*imageactions.autorotate(self.app.paths))
+            return
+        exif_data = exif.get_exif_many(list(self.app.paths))
+        jobs = [(path, ()) for path, data in exif_data.items()
+                if data.tags.get(exif.ORIENTATION, 1) != 1]
+        if not jobs:
+            self.show_autorotated(0, "PIL")
+            return
+
+        def callback(batch):
+            self.show_autorotated(sum(map(bool, batch.results.values())),
+                                  "PIL")
+        self.app["jobs"].run(imageactions.autorotate_file, jobs,
+                             "Autorotating", on_file=self.reload_thumbnail,
+                             callback=callback)
+
+    def show_autorotated(self, amount, method):
+        """Reload the image and show how many images were autorotated.
+
+        Args:
+            amount: Number of rotated images.
+            method: Method used to rotate them.
+        """
         if amount:
-            self.app["image"].load_image()
+            if self.app.paths:
+                self.app["image"].load_image()
             message = "Autorotated %d image(s) using %s." % (amount, method)
         else:
             message = "No image rotated. Tried using %s." % (method)
         self.app["statusbar"].message(message, "info")
 
+    def export(self):
+        """Write the non-destructive edits of the images into the files.
+
+        The edit stacks are cleared at once, so new edits apply to the
+        exported files. Edits of files which could not be exported are
+        restored.
+        """
+        self.run_simple_manipulations()
+        exported = {}
+        for path in self.get_manipulated_images("Exported"):
+            operations = editstack.load(path)
+            if operations:
+                exported[path] = operations
+                editstack.save(path, [])
+        if not exported:
+            self.app["statusbar"].message("No edits to export", "info")
+            return
+
+        backups = self.app["journal"].get_backups(list(exported))
+        if backups:
+            steps = []
+            for path, backup in zip(exported, backups):
+                if backup is None:
+                    continue  # Exporting fails as the image cannot be read
+                steps.append(("stack", path, exported[path], []))
+                steps.append(("rewrite", path, imageactions.export_file,
+                              (exported[path],), backup))
+            self.app["journal"].record("export", steps)
+        else:
+            backups = [None] * len(exported)
+
+        def callback(batch):
+            for path, _ in batch.errors:
+                editstack.save(path, exported[path] + editstack.load(path))
+                self.reload_thumbnail(path)
+        self.app["jobs"].run(imageactions.export_file,
+                             [(path, (operations, backup))
+                              for (path, operations), backup
+                              in zip(exported.items(), backups)],
+                             "Exporting", on_file=self.on_file_modified,
+                             callback=callback)
+
     def toggle(self):
         """Toggle the manipulation bar."""
         if self.scrolled_win.is_visible():
@@ -282,16 +405,25 @@ class Manipulate(object):
             elif self.app["image"].is_anim:
                 self.app["statusbar"].message(
                     "Manipulating Gifs is not supported", "warning")
+            elif self.app["jobs"].has_jobs(self.app.paths[self.app.index]):
+                self.app["statusbar"].message(
+                    "Image is still being saved", "warning")
             else:
                 self.scrolled_win.show()
                 self.sliders["bri"].grab_focus()
                 self.app["statusbar"].update_info()
                 # Create PIL image to work with
                 size = self.app["image"].imsize
-                self.pil_image = Image.open(self.app.paths[self.app.index])
                 self.pil_thumb = Image.open(self.app.paths[self.app.index])
                 # pylint: disable=no-member
                 self.pil_thumb.thumbnail(size, Image.ANTIALIAS)
+                # The preview is shown upright and edited like the image
+                path = self.app.paths[self.app.index]
+                self.pil_thumb = imageactions.transpose(
+                    self.pil_thumb, imageactions.get_orientation(path))
+                self.pil_thumb = enhance.prepare(imageactions.apply_operations(
+                    self.pil_thumb, editstack.load(path)))
+                self.thumb_histogram = self.pil_thumb.histogram()
         else:
             if self.app["thumbnail"].toggled:
                 self.app["statusbar"].message(
@@ -307,41 +439,114 @@ class Manipulate(object):
         """Apply manipulations to image.
 
         Manipulations are the three sliders for brightness, contrast and
-        sharpness. They are applied to a thumbnail by default and can act on the
-        real image.
+        sharpness. They are applied to a thumbnail and can be saved to the real
+        image in the background or to its edit stack.
 
         Args:
-            real: If True, apply manipulations to the real image.
+            apply_to_file: If True, apply manipulations to the real image.
         """
-        if apply_to_file:
-            imfile = self.pil_image
-        else:
-            imfile = self.pil_thumb
         # Apply Brightness, Contrast and Sharpness
-        enhanced_im = ImageEnhance.Brightness(imfile).enhance(
-            self.manipulations["bri"])
-        enhanced_im = ImageEnhance.Contrast(enhanced_im).enhance(
-            self.manipulations["con"])
-        enhanced_im = ImageEnhance.Sharpness(enhanced_im).enhance(
-            self.manipulations["sha"])
-        # On real file save data to file
-        if apply_to_file:
-            imageactions.save_image(enhanced_im, self.app.paths[self.app.index])
-        # Load Pixbuf from PIL data
-        data = enhanced_im.tobytes()
-        g_data = GLib.Bytes.new(data)
-        # pylint: disable=no-member
-        w, h = imfile.size
-        if imfile.mode == "RGBA":
-            pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(
-                g_data, GdkPixbuf.Colorspace.RGB, True, 8, w, h, 4 * w)
-        else:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(
-                g_data, GdkPixbuf.Colorspace.RGB, False, 8, w, h, 3 * w)
-        # Show the edited pixbuf
-        self.app["image"].pixbuf_original = pixbuf
-        self.app["image"].update()
-        self.app["image"].zoom_to(0)
+        enhanced_im = enhance.enhance(self.pil_thumb, self.manipulations,
+                                      self.thumb_histogram)
+        self.show_pixbuf(editstack.pixbuf_from_image(enhanced_im))
+        if apply_to_file and self.manipulations != {"bri": 1, "con": 1,
+                                                    "sha": 1}:
+            path = self.app.paths[self.app.index]
+            manipulations = dict(self.manipulations)
+            if self.is_non_destructive(path):
+                self.app["journal"].record(
+                    "enhance",
+                    [self.push_edit(path, ("enhance", manipulations))])
+                self.reload_thumbnail(path)
+                return
+            backups = self.app["journal"].get_backups([path])
+            backup = backups[0] if backups else None
+            if backup:
+                self.app["journal"].record(
+                    "enhance", [("rewrite", path, imageactions.enhance_file,
+                                 (manipulations,), backup)])
+            self.app["jobs"].run(imageactions.enhance_file,
+                                 [(path, (manipulations, backup))],
+                                 "Enhancing", on_file=self.on_file_modified)
+
+    def on_file_modified(self, path, *args):
+        """Show a file once it was modified.
+
+        Args:
+            path: Path to the modified file.
+            args: Further arguments passed by the job runner, ignored.
+        """
+        # Files which are still modified are shown after the last job
+        if self.app["jobs"].has_jobs(path):
+            return
+        self.reload_thumbnail(path)
+        # The user may have moved on or started editing again meanwhile
+        if self.app.paths and self.app.paths[self.app.index] == path \
+                and not self.scrolled_win.is_visible() \
+                and not self.app["thumbnail"].toggled:
+            self.app["image"].load_image()
+
+    def show_pixbuf(self, pixbuf):
+        """Show an edited pixbuf fitted to the window scaling it only once.
+
+        Args:
+            pixbuf: The GdkPixbuf.Pixbuf to show.
+        """
+        image = self.app["image"]
+        image.pixbuf_original = pixbuf
+        image.imsize = image.get_available_size()
+        image.zoom_percent = image.get_zoom_percent_to_fit()
+        image.fit_image = 1
+        image.update()
+
+    def schedule_preview(self):
+        """Render the preview once the main loop is idle.
+
+        All slider changes until then, e.g. when holding a key, are rendered
+        together using only the latest values.
+        """
+        if not self.render_id:
+            self.render_id = GLib.idle_add(self.render_preview)
+
+    def render_preview(self):
+        """Render the preview with the current manipulations in a thread."""
+        self.render_id = 0
+        self.render_generation += 1
+        self._thread_pool.apply_async(
+            self._render, (self.render_generation, dict(self.manipulations)),
+            callback=self._do_callback)
+        return False  # Only run once
+
+    def cancel_preview(self):
+        """Drop all scheduled and running preview renders."""
+        if self.render_id:
+            GLib.source_remove(self.render_id)
+            self.render_id = 0
+        self.render_generation += 1
+
+    def _render(self, generation, manipulations):
+        # Skip renders which were superseded while waiting for the thread
+        if generation != self.render_generation:
+            return None
+        enhanced_im = enhance.enhance(self.pil_thumb, manipulations,
+                                      self.thumb_histogram)
+        return editstack.pixbuf_from_image(enhanced_im), generation
+
+    def _do_callback(self, result):
+        if result is not None:
+            GLib.idle_add(self._on_preview_rendered, *result)
+
+    def _on_preview_rendered(self, pixbuf, generation):
+        """Show a rendered preview unless it was superseded.
+
+        Args:
+            pixbuf: The rendered GdkPixbuf.Pixbuf.
+            generation: Value of render_generation when the render started.
+        """
+        if generation == self.render_generation \
+                and self.scrolled_win.is_visible():
+            self.show_pixbuf(pixbuf)
+        return False  # Only run once
 
     def value_slider(self, slider, name):
         """Set value of self.manipulations according to slider value.
@@ -354,8 +559,7 @@ class Manipulate(object):
         val = (val + 127) / 127
         # Change brightness, contrast or sharpness
         self.manipulations[name] = val
-        # Run the manipulation function
-        self.manipulate_image()
+        self.schedule_preview()
 
     def focus_slider(self, name):
         """Set focus on one of the three sliders.
@@ -411,9 +615,12 @@ class Manipulate(object):
         self.manipulations = {"bri": 1, "con": 1, "sha": 1}
         for slider in self.sliders.values():
             slider.set_value(0)
-        # Show the original image
-        self.app["image"].fit_image = 1
-        self.app["image"].load_image()
+        self.cancel_preview()
+        # Show the original image, an accepted preview is shown until the file
+        # was saved
+        if not accept:
+            self.app["image"].fit_image = 1
+            self.app["image"].load_image()
         # Done
         self.toggle()
         self.app["statusbar"].update_info()
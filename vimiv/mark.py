@@ -3,21 +3,36 @@
 
 import os
 
+from vimiv.helpers import OrderedSet, PathList
+
 
 class Mark(object):
     """Handle marking of images.
 
     Attributes:
         app: The main vimiv application to interact with.
-        marked: List of currently marked images.
+        marked: OrderedSet of currently marked images. Assigning to it replaces
+            the content in place so references to it remain valid.
         marked_bak: List of last marked images to be able to toggle mark status.
     """
 
     def __init__(self, app, settings):
         self.app = app
-        self.marked = []
+        self._marked = OrderedSet()
         self.marked_bak = []
 
+    @property
+    def marked(self):
+        """OrderedSet of currently marked images."""
+        return self._marked
+
+    @marked.setter
+    def marked(self, images):
+        """Replace all marked images with images."""
+        images = list(images)
+        self._marked.clear()
+        self._marked.update(images)
+
     def mark(self):
         """Mark the current image."""
         # Check which image
@@ -27,7 +42,7 @@ class Mark(object):
             if current in self.marked:
                 self.marked.remove(current)
             else:
-                self.marked.append(current)
+                self.marked.add(current)
             self.mark_reload(False, [current])
         else:
             self.app["statusbar"].message(
@@ -40,28 +55,28 @@ class Mark(object):
         images are re-marked.
         """
         if self.marked:
-            self.marked_bak = self.marked
+            self.marked_bak = list(self.marked)
             self.marked = []
         else:
-            self.marked, self.marked_bak = self.marked_bak, self.marked
-        to_reload = self.marked + self.marked_bak
+            self.marked, self.marked_bak = self.marked_bak, []
+        to_reload = list(self.marked) + self.marked_bak
         self.mark_reload(False, to_reload)
 
     def mark_all(self):
         """Mark all images."""
         # Get the correct filelist
         if self.app["library"].treeview.is_focus():
-            files = []
-            for fil in self.app["library"].files:
-                files.append(os.path.abspath(fil))
+            library = self.app["library"]
+            files = [library.snapshot.get_path(fil)
+                     for fil in library.files
+                     if not library.is_directory(fil)]
         elif self.app.paths:
             files = self.app.paths
         else:
             self.app["statusbar"].message("No image to mark", "error")
+            return
         # Add all to the marks
-        for fil in files:
-            if os.path.isfile(fil) and fil not in self.marked:
-                self.marked.append(fil)
+        self.marked.update(files)
         self.mark_reload()
 
     def mark_between(self):
@@ -70,37 +85,38 @@ class Mark(object):
         if len(self.marked) < 2:
             self.app["statusbar"].message("Not enough marks", "error")
             return
-        start = self.marked[-2]
-        end = self.marked[-1]
+        last_marks = reversed(self.marked)
+        end = next(last_marks)
+        start = next(last_marks)
         # Get the correct filelist
         if self.app["library"].treeview.is_focus():
-            files = []
-            for fil in self.app["library"].files:
-                if not os.path.isdir(fil):
-                    files.append(os.path.abspath(fil))
+            library = self.app["library"]
+            files = PathList(library.snapshot.get_path(fil)
+                             for fil in library.files
+                             if not library.is_directory(fil))
         elif self.app.paths:
             files = self.app.paths
         else:
             self.app["statusbar"].message("No image to mark", "error")
+            return
         # Find the images to mark
-        for i, image in enumerate(files):
-            if image == start:
-                start = i
-            elif image == end:
-                end = i
-        for i in range(start + 1, end):
-            self.marked.insert(-1, files[i])
+        if start not in files or end not in files:
+            self.app["statusbar"].message("Marks are not in filelist", "error")
+            return
+        # Images in between are inserted before the last mark
+        self.marked.remove(end)
+        self.marked.update(files[files.index(start) + 1:files.index(end)])
+        self.marked.add(end)
         self.mark_reload()
 
     def mark_reload(self, reload_all=True, current=None):
         """Reload all information which contains marks."""
         # Update lib
         if self.app["library"].grid.is_visible():
-            model = self.app["library"].treeview.get_model()
-            for i, name in enumerate(self.app["library"].files):
-                model[i][3] = "[*]" \
-                    if os.path.abspath(name) in self.marked \
-                    else ""
+            library = self.app["library"]
+            model = library.treeview.get_model()
+            for i, name in enumerate(library.files):
+                model[i][3] = "[*]" if library.is_marked(name) else ""
         # Reload thumb names
         if self.app["thumbnail"].toggled:
             reload_list = self.app.paths if reload_all else current
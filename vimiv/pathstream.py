@@ -0,0 +1,349 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Populate the filelist in the background while vimiv is already running."""
+
+import bisect
+import heapq
+import os
+import time
+from collections import Counter
+from multiprocessing.pool import ThreadPool as Pool
+from random import shuffle
+from threading import Lock, Thread
+
+from gi.repository import GLib
+from vimiv import filetypes, sorting
+from vimiv.fileindex import FileIndex, create_record
+
+
+def _find_positions(paths, new_paths):
+    """Return the positions in paths to insert new_paths at to keep the order.
+
+    Args:
+        paths: Sorted list of paths.
+        new_paths: Sorted list of paths to insert. They are inserted after
+            paths with the same key.
+    Return:
+        List of the position of every new path in paths.
+    """
+    positions = []
+    low = 0
+    for path in new_paths:
+        key = sorting.get_key(path)
+        high = len(paths)
+        while low < high:
+            middle = (low + high) // 2
+            if key < sorting.get_key(paths[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        positions.append(low)
+    return positions
+
+
+def _insert(paths, new_paths, positions):
+    """Return a list of paths with new_paths inserted before positions."""
+    merged = []
+    last = 0
+    for path, position in zip(new_paths, positions):
+        merged.extend(paths[last:position])
+        merged.append(path)
+        last = position
+    merged.extend(paths[last:])
+    return merged
+
+
+class PathStream(object):
+    """Find images in worker threads and add them to app.paths in batches.
+
+    Directories are walked in parallel and every file is classified as soon as
+    it is found. The images are merged into app.paths from the main loop in
+    sorted order keeping the current image focused, so the first image is
+    shown right away while the filelist keeps growing. Paths read from a pipe
+    are classified in parallel as well but keep the order they were given in.
+
+    Attributes:
+        app: The main vimiv application to interact with.
+        running: If True paths are still being added.
+        sort: If True merge new images in sorted order, else append them.
+        generation: Counter increased for every new stream. Results of older
+            streams are dropped.
+        pending: List of images waiting to be merged into paths.
+        target: The PathList the stream adds to. If app.paths is replaced,
+            e.g. by opening a different directory, the stream stops.
+        timer_id: ID of the timer merging pending images.
+        flush_interval: Minimum time in ms between two merges into app.paths.
+        flush_time: Time in s the last merge took. Merges take longer the
+            more paths there are, the time between two merges grows with it
+            so the main loop stays responsive.
+        batch_size: Number of lines read from a pipe classified at once.
+        index: FileIndex used to skip directories which did not change since
+            the last search. None if the file_index setting is disabled.
+
+        _tasks: Counter of unfinished worker tasks by generation.
+        _lock: Lock guarding _tasks.
+    """
+
+    _cpu_count = os.cpu_count()
+    if _cpu_count is None:
+        _cpu_count = 1
+    elif _cpu_count > 1:
+        _cpu_count -= 1
+
+    _thread_pool = Pool(_cpu_count)
+
+    def __init__(self, app):
+        """Set default values.
+
+        Args:
+            app: The main vimiv application to interact with.
+        """
+        self.app = app
+        self.running = False
+        self.sort = True
+        self.generation = 0
+        self.pending = []
+        self.target = None
+        self.timer_id = 0
+        self.flush_interval = 100
+        self.flush_time = 0
+        self.batch_size = 256
+        self.index = None
+        if app.settings["GENERAL"]["file_index"]:
+            self.index = FileIndex(os.path.join(app.directory, "fileindex.db"))
+        self._tasks = Counter()
+        self._lock = Lock()
+
+    def walk(self, directories):
+        """Search directories recursively for images in the background.
+
+        Args:
+            directories: List of directories to search.
+        """
+        self._start(True)
+        for directory in directories:
+            self._submit(self._scan_directory, self.generation,
+                         os.path.abspath(directory))
+
+    def feed(self, lines):
+        """Add all images in lines, e.g. read from stdin, in the background.
+
+        Args:
+            lines: Iterable of lines containing one path each.
+        """
+        self._start(False)
+        with self._lock:
+            self._tasks[self.generation] += 1
+        reader = Thread(target=self._read_lines, args=(self.generation, lines))
+        reader.daemon = True
+        reader.start()
+
+    def stop(self):
+        """Stop adding paths, running workers drop their results."""
+        self.generation += 1
+        self.running = False
+        self.pending = []
+        if self.timer_id:
+            GLib.source_remove(self.timer_id)
+            self.timer_id = 0
+
+    def close(self):
+        """Stop adding paths and close the file index."""
+        self.stop()
+        if self.index:
+            self.index.close()
+
+    def _start(self, sort):
+        self.stop()
+        self.running = True
+        self.flush_time = 0
+        self.sort = sort
+        self.target = self.app.paths
+
+    def _submit(self, function, generation, *args):
+        with self._lock:
+            self._tasks[generation] += 1
+        self._thread_pool.apply_async(function, (generation,) + args)
+
+    def _on_task_done(self, generation):
+        with self._lock:
+            self._tasks[generation] -= 1
+            finished = not self._tasks[generation]
+            if finished:
+                del self._tasks[generation]
+        if finished:
+            GLib.idle_add(self._finish, generation)
+
+    def _read_lines(self, generation, lines):
+        # Batches are classified in parallel but returned in order
+        try:
+            for images in self._thread_pool.imap(self._check_paths,
+                                                 self._split_lines(lines)):
+                if generation != self.generation:
+                    break
+                if images:
+                    GLib.idle_add(self._add_batch, generation, images)
+        except (OSError, ValueError):
+            pass  # Reading from the pipe failed, keep what was found
+        finally:
+            self._on_task_done(generation)
+
+    def _split_lines(self, lines):
+        batch = []
+        for line in lines:
+            line = line.rstrip("\n")
+            if line:
+                batch.append(line)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _check_paths(paths):
+        paths = [os.path.abspath(path) for path in paths]
+        return [path for path in paths if filetypes.is_image(path)]
+
+    def _scan_directory(self, generation, directory):
+        try:
+            # A new stream was started in the meantime
+            if generation != self.generation:
+                return
+            mtime_ns = os.stat(directory).st_mtime_ns
+            content = self.index.get_directory(directory, mtime_ns) \
+                if self.index else None
+            if content is None:
+                content = self._read_directory(directory, mtime_ns)
+            subdirectories, images = content
+            for subdirectory in subdirectories:
+                self._submit(self._scan_directory, generation, subdirectory)
+            # Compute the sort keys here instead of in the main loop
+            for image in images:
+                sorting.get_key(image)
+            if images:
+                GLib.idle_add(self._add_batch, generation, images)
+        except OSError:
+            pass  # Skip directories which cannot be read
+        except Exception as e:  # pylint: disable=broad-except
+            # E.g. a broken file index or a name that cannot be encoded, skip
+            # the directory instead of never finishing the stream
+            GLib.idle_add(self._log_error, directory, e)
+        finally:
+            self._on_task_done(generation)
+
+    def _read_directory(self, directory, mtime_ns):
+        subdirectories = []
+        images = []
+        records = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif self.index:
+                        record = create_record(entry.path, entry.stat())
+                        if record:
+                            images.append(entry.path)
+                            records.append(record)
+                    elif filetypes.is_image(entry.path, entry.stat()):
+                        images.append(entry.path)
+                except OSError:
+                    continue
+        if self.index:
+            self.index.set_directory(directory, mtime_ns, subdirectories,
+                                     records)
+        return subdirectories, images
+
+    def _log_error(self, directory, error):
+        self.app["log"].write_message(
+            "pathstream", "%s: %s" % (directory, str(error) or
+                                      type(error).__name__))
+        return False  # Only run once
+
+    def _add_batch(self, generation, images):
+        """Collect a batch of images found by a worker.
+
+        Args:
+            generation: Generation of the stream the images belong to.
+            images: List of found images.
+        """
+        if generation == self.generation:
+            self.pending.extend(images)
+            if not self.app.paths:  # Show the first image immediately
+                self._flush()
+            elif not self.timer_id:
+                # Spend at most a tenth of the time merging, this also keeps
+                # the work of all merges of a stream linear in its length
+                interval = max(self.flush_interval,
+                               int(self.flush_time * 10000))
+                self.timer_id = GLib.timeout_add(interval, self._flush)
+        return False  # Only run once
+
+    def _flush(self):
+        """Merge all pending images into app.paths."""
+        self.timer_id = 0
+        if not self.pending:
+            return False
+        if self.app.paths is not self.target:
+            self.stop()
+            return False
+        start = time.monotonic()
+        old_paths = self.app.paths
+        amount = len(self.pending)
+        if self.sort:
+            new_paths = sorting.sort_paths(self.pending)
+            # Searching the position of every path of a small batch only needs
+            # the keys of a few paths instead of the keys of all paths
+            if amount * 32 < len(old_paths):
+                positions = _find_positions(old_paths, new_paths)
+                self.app.paths = _insert(old_paths, new_paths, positions)
+                index = self.app.index \
+                    + bisect.bisect_right(positions, self.app.index)
+            else:
+                self.app.paths = heapq.merge(old_paths, new_paths,
+                                             key=sorting.get_key)
+                index = self.app.paths.index(old_paths[self.app.index]) \
+                    if old_paths else 0
+            self.target = self.app.paths
+        else:
+            self.app.paths.extend(self.pending)
+        self.pending = []
+        if not old_paths:
+            self.app.index = 0
+            self.app.show_paths()
+        elif self.sort:
+            self._update_widgets(old_paths, index)
+        else:
+            if self.app["thumbnail"].toggled:
+                self.app["thumbnail"].append(amount)
+            self.app["statusbar"].update_info()
+        self.flush_time = time.monotonic() - start
+        return False  # Only run once
+
+    def _finish(self, generation):
+        """Merge the remaining images once all workers are done.
+
+        Args:
+            generation: Generation of the stream that finished.
+        """
+        if generation != self.generation:
+            return False
+        if self.app.paths is not self.target:
+            self.stop()
+            return False
+        if self.timer_id:
+            GLib.source_remove(self.timer_id)
+        self._flush()
+        self.running = False
+        if self.app.settings["GENERAL"]["shuffle"] and self.app.paths:
+            old_paths = list(self.app.paths)
+            current = old_paths[self.app.index]
+            shuffle(self.app.paths)
+            self._update_widgets(old_paths, self.app.paths.index(current))
+        return False  # Only run once
+
+    def _update_widgets(self, old_paths, index):
+        self.app.index = index
+        if self.app["thumbnail"].toggled:
+            self.app["thumbnail"].update_paths(old_paths)
+        self.app["statusbar"].update_info()
@@ -0,0 +1,182 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Snapshots of directories gathered in a single pass using os.scandir.
+
+The DirectoryCache keeps snapshots of recently visited directories. They are
+invalidated by file monitors so revisiting a directory does not touch the disk
+while changes done by other programs still show up.
+"""
+
+import collections
+import os
+from stat import S_ISDIR
+
+from gi.repository import Gio, GLib
+from vimiv import filetypes
+from vimiv.sorting import natural_sorted
+
+FileEntry = collections.namedtuple(
+    "FileEntry",
+    ["name", "is_dir", "is_link", "target", "size", "mtime", "is_image"])
+
+
+class DirectorySnapshot(object):
+    """Information on all files in a directory.
+
+    Type, size, symlink target and modification time of every file are
+    collected with one stat call per file. Broken symbolic links are skipped.
+
+    Attributes:
+        directory: Absolute path of the directory.
+        show_hidden: If True hidden files were included.
+        entries: Dictionary of FileEntry tuples by filename.
+        names: Naturally sorted list of all filenames.
+        mtime_ns: Modification time of the directory when it was scanned.
+    """
+
+    def __init__(self, directory, show_hidden=False):
+        """Scan the directory.
+
+        Args:
+            directory: Directory to scan.
+            show_hidden: If True include hidden files.
+        """
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.show_hidden = show_hidden
+        self.mtime_ns = os.stat(self.directory).st_mtime_ns
+        self.entries = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not show_hidden and entry.name.startswith("."):
+                    continue
+                try:
+                    is_link = entry.is_symlink()
+                    stat = entry.stat()
+                except OSError:  # Broken symbolic link
+                    continue
+                is_dir = S_ISDIR(stat.st_mode)
+                target = os.path.realpath(entry.path) if is_link else ""
+                is_image = not is_dir and filetypes.is_image(entry.path, stat)
+                self.entries[entry.name] = FileEntry(
+                    entry.name, is_dir, is_link, target, stat.st_size,
+                    stat.st_mtime, is_image)
+        self.names = natural_sorted(self.entries)
+
+    def __getitem__(self, name):
+        return self.entries[name]
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def get_path(self, name):
+        """Return the absolute path of the file called name."""
+        return os.path.join(self.directory, name)
+
+    def is_current(self):
+        """Return False if files were added, removed or renamed since."""
+        try:
+            return os.stat(self.directory).st_mtime_ns == self.mtime_ns
+        except OSError:
+            return False
+
+
+class DirectoryCache(object):
+    """Cache of DirectorySnapshots invalidated by file monitors.
+
+    Attributes:
+        callback: Function called with the directory as argument once changes
+            in a monitored directory have settled.
+        delay: Time in ms to wait for further changes before calling callback.
+        size: Maximum amount of directories kept in the cache.
+        ignore: Function called with the path of a changed file returning True
+            if the change should not trigger callback or None.
+
+        _snapshots: OrderedDict of snapshots by directory and show_hidden.
+            Invalidated snapshots are None.
+        _monitors: Dictionary of Gio.FileMonitors by directory.
+        _timers: Dictionary of pending GLib timer ids by directory.
+    """
+
+    def __init__(self, callback=None, delay=200, size=64, ignore=None):
+        """Create the empty cache.
+
+        Args:
+            callback: Function called with the directory once it changed.
+            delay: Time in ms to wait for further changes.
+            size: Maximum amount of directories kept in the cache.
+            ignore: Function deciding which changed files are ignored.
+        """
+        self.callback = callback
+        self.delay = delay
+        self.size = size
+        self.ignore = ignore
+        self._snapshots = collections.OrderedDict()
+        self._monitors = {}
+        self._timers = {}
+
+    def get(self, directory, show_hidden=False):
+        """Return a snapshot of directory, scanning it only if necessary.
+
+        Args:
+            directory: Directory to get the snapshot of.
+            show_hidden: If True include hidden files.
+        Return:
+            The DirectorySnapshot.
+        """
+        directory = os.path.abspath(os.path.expanduser(directory))
+        key = (directory, show_hidden)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None or not snapshot.is_current():
+            snapshot = DirectorySnapshot(directory, show_hidden)
+            self._snapshots[key] = snapshot
+            self._watch(directory)
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self.size:
+            old_directory = self._snapshots.popitem(last=False)[0][0]
+            if not any((old_directory, hidden) in self._snapshots
+                       for hidden in [False, True]):
+                self._unwatch(old_directory)
+        return snapshot
+
+    def invalidate(self, directory):
+        """Force the next call of get to scan directory again."""
+        directory = os.path.abspath(os.path.expanduser(directory))
+        for key in [(directory, False), (directory, True)]:
+            if key in self._snapshots:
+                self._snapshots[key] = None
+
+    def __contains__(self, directory):
+        return any(self._snapshots.get((directory, show_hidden))
+                   for show_hidden in [False, True])
+
+    def _watch(self, directory):
+        if directory in self._monitors:
+            return
+        try:
+            monitor = Gio.File.new_for_path(directory).monitor_directory(
+                Gio.FileMonitorFlags.NONE, None)
+        except GLib.Error:  # Monitoring is not supported, rely on mtime
+            return
+        monitor.connect("changed", self._on_changed, directory)
+        self._monitors[directory] = monitor
+
+    def _unwatch(self, directory):
+        monitor = self._monitors.pop(directory, None)
+        if monitor:
+            monitor.cancel()
+        timer_id = self._timers.pop(directory, None)
+        if timer_id:
+            GLib.source_remove(timer_id)
+
+    def _on_changed(self, monitor, gfile, other_file, event_type, directory):
+        self.invalidate(directory)
+        if self.ignore and gfile and self.ignore(gfile.get_path()):
+            return
+        # Wait for further changes, e.g. while a file is being written
+        if self.callback and directory not in self._timers:
+            self._timers[directory] = GLib.timeout_add(
+                self.delay, self._emit_changed, directory)
+
+    def _emit_changed(self, directory):
+        del self._timers[directory]
+        self.callback(directory)
+        return False  # Only run once
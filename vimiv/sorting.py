@@ -0,0 +1,110 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Sort filelists naturally or by modification time, size or exif date.
+
+The sort key of every file is computed only once and cached by path, so
+sorting a large filelist again is a cheap operation in memory. Keys of files
+that changed on disk have to be removed using uncache.
+"""
+
+import os
+import re
+
+from vimiv import exif
+
+METHODS = ["natural", "mtime", "size", "exif"]
+
+_cache = {}
+_current = {"method": "natural"}
+
+
+def natural_key(string):
+    """Return a key to sort strings containing numbers naturally.
+
+    IMG_2 is sorted before IMG_10. Case is preserved.
+
+    Args:
+        string: The string to create the key for.
+    """
+    # Splitting on a group always returns text at even and numbers at odd
+    # positions, so only strings are compared to strings and ints to ints
+    parts = re.split(r"(\d+)", string)
+    parts[1::2] = [int(part) for part in parts[1::2]]
+    return parts
+
+
+def natural_sorted(strings):
+    """Return a naturally sorted list of strings."""
+    return sorted(strings, key=natural_key)
+
+
+def _compute_keys(path, method):
+    keys = {"natural": natural_key(path)}
+    if method in ["mtime", "size"]:
+        try:
+            stat_result = os.stat(path)
+            keys["mtime"] = stat_result.st_mtime
+            keys["size"] = stat_result.st_size
+        except OSError:
+            keys["mtime"] = keys["size"] = 0
+    elif method == "exif":
+        # Images without date are sorted to the end
+        date = exif.get_tags(path).get(exif.DATETIME_ORIGINAL)
+        keys["exif"] = (0, date) if date else (1, "")
+    return keys
+
+
+def get_key(path, method=None):
+    """Return the cached sort key of a path, computing it if necessary.
+
+    Args:
+        path: Path to get the key of.
+        method: Sort method, one of METHODS. Defaults to the current method.
+    """
+    method = method if method else _current["method"]
+    keys = _cache.get(path)
+    if keys is None:
+        keys = _cache[path] = _compute_keys(path, method)
+    elif method not in keys:
+        keys.update(_compute_keys(path, method))
+    # Files with equal keys are sorted naturally
+    return keys[method], keys["natural"]
+
+
+def sort_paths(paths, method=None):
+    """Return a sorted list of paths.
+
+    Args:
+        paths: Iterable of paths to sort.
+        method: Sort method, one of METHODS. Defaults to the current method.
+    """
+    method = method if method else _current["method"]
+    paths = list(paths)
+    if method == "exif":
+        # Read the exif data of all new files in parallel
+        exif.get_exif_many([path for path in paths
+                            if method not in _cache.get(path, {})])
+    return sorted(paths, key=lambda path: get_key(path, method))
+
+
+def get_method():
+    """Return the current sort method."""
+    return _current["method"]
+
+
+def set_method(method):
+    """Set the current sort method.
+
+    Args:
+        method: One of METHODS.
+    Return:
+        True if the method exists.
+    """
+    if method not in METHODS:
+        return False
+    _current["method"] = method
+    return True
+
+
+def uncache(path):
+    """Remove the cached keys of a path, e.g. after it changed on disk."""
+    _cache.pop(path, None)
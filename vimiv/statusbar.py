@@ -4,6 +4,7 @@
 import os
 
 from gi.repository import Gdk, GLib, Gtk
+from vimiv import exif
 
 
 class Statusbar(object):
@@ -19,10 +20,12 @@ class Statusbar(object):
         size: Height of the statusbar.
         lock: If True do not update any information.
         was_hidden: If True the statusbar was hidden before an error message.
+        date: Tuple of the path and the exif date of the last image shown.
         bar: Gtk.Grid containing all widgets.
         left_label: Gtk.Label containing position, name and zoom.
         right_label: Gtk.Label containing mode and prefixed numbers.
-        center_label: Gtk.Label containing mark status and slideshow info.
+        center_label: Gtk.Label containing mark status, slideshow info, the
+            progress of running jobs and the exif date of the current image.
         separator: Gtk.Separator used as background of the statusbar. Makes sure
             the other widgets do not interfere with the overlaying bar.
     """
@@ -40,6 +43,7 @@ class Statusbar(object):
         self.size = 0
         self.lock = False
         self.was_hidden = False
+        self.date = ("", "")
 
         # Statusbar on the bottom
         self.bar = Gtk.Grid()
@@ -170,9 +174,45 @@ class Statusbar(object):
         slideshow = \
             "[slideshow - {0:.1f}s]".format(self.app["slideshow"].delay) \
             if self.app["slideshow"].running else ""
-        message = "{0}  {1}".format(mark, slideshow)
+        message = "{0}  {1}  {2}  {3}".format(
+            mark, slideshow, self.app["jobs"].get_progress(),
+            self.get_date(mode))
         self.center_label.set_text(message)
 
+    def get_date(self, mode):
+        """Return the exif date of the current image if it is known.
+
+        The exif data is read in the background, the centre of the statusbar
+        is updated once it is available.
+
+        Args:
+            mode: The current mode.
+        Return:
+            The date or an empty string.
+        """
+        if not ("IMAGE" in mode or "MANIPULATE" in mode) \
+                or not self.app.paths:
+            return ""
+        path = self.app.paths[self.app.index]
+        if self.date[0] == path:
+            return self.date[1]
+        exif.get_exif_async(path, self._on_exif_read)
+        return ""
+
+    def _on_exif_read(self, path, exif_data):
+        """Show the date of an image once its exif data was read.
+
+        Args:
+            path: Path to the image.
+            exif_data: exif.ExifData of the image.
+        """
+        tags = exif_data.tags
+        self.date = (path, tags.get(exif.DATETIME_ORIGINAL,
+                                    tags.get(exif.DATETIME, "")))
+        if self.app.paths and self.app.paths[self.app.index] == path:
+            self.set_center_status(self.get_mode())
+        return False  # Only run once
+
     def set_right_status(self, mode):
         """Set the right side of the statusbar to mode and num_str."""
         message = "{0:15}  {1:4}".format(mode, self.app["eventhandler"].num_str)
@@ -5,7 +5,7 @@ import os
 from math import floor
 
 from gi.repository import GdkPixbuf, GLib, Gtk
-from vimiv.fileactions import populate
+from vimiv.fileactions import file_signature, populate
 from vimiv.thumbnail_manager import ThumbnailManager
 
 
@@ -20,9 +20,13 @@ class Thumbnail(object):
         zoom_levels: List of tuples containing the possible thumbnail sizes.
         zoom_level_index: Position in the possible_sizes list.
         directory: Directory in which thumbnails are stored.
-        timer_id: ID of the currently running GLib.Timeout.
-            creation failed.
+        timer_id: ID of the pending update of the visible thumbnails.
         elements: List containing names of current thumbnail-files.
+        default_pixbuf: Placeholder pixbuf shown for thumbnails not loaded.
+        loaded: Set of positions which currently hold a real thumbnail.
+        generation: Counter to drop thumbnails requested for an old model.
+        signatures: Dictionary storing the file signature of every loaded
+            thumbnail to find out which files changed.
         markup: Markup string used to highlight search results.
         liststore: Gtk.ListStore containing thumbnail pixbufs and names.
         iconview: Gtk.IconView to display thumbnails.
@@ -44,8 +48,12 @@ class Thumbnail(object):
         self.toggled = False
         self.padding = general["thumb_padding"]
         self.directory = os.path.join(self.app.directory, "Thumbnails")
-        self.timer_id = GLib.Timeout
+        self.timer_id = 0
         self.elements = []
+        self.default_pixbuf = None
+        self.loaded = set()
+        self.generation = 0
+        self.signatures = {}
         self.markup = self.app["library"].markup.replace("fore", "back")
 
         zoom_level = general["default_thumbsize"]
@@ -71,6 +79,10 @@ class Thumbnail(object):
         self.iconview.set_item_padding(self.padding)
         self.last_focused = ""
         self.thumbnail_manager = ThumbnailManager()
+        # Only thumbnails in the visible area are kept in memory, update them
+        # whenever the view is scrolled
+        vadjustment = self.app["image"].scrolled_win.get_vadjustment()
+        vadjustment.connect("value-changed", self.schedule_visible_update)
 
     def iconview_clicked(self, iconview, path):
         """Select and show image when thumbnail was activated.
@@ -114,7 +126,8 @@ class Thumbnail(object):
         elif self.app["library"].files \
                 and self.app["library"].treeview.is_focus():
             self.last_focused = "lib"
-            self.app.paths, self.app.index = populate(self.app["library"].files)
+            self.app.paths, self.app.index = populate(
+                self.app["library"].files, sort=True)
             if self.app.paths:
                 self.app["library"].scrollable_treeview.set_hexpand(False)
                 self.app["image"].scrolled_win.show()
@@ -146,6 +159,8 @@ class Thumbnail(object):
         padding = floor(free_space / self.columns)
         self.iconview.set_column_spacing(padding)
         self.iconview.set_columns(self.columns)
+        # A different amount of columns means different visible thumbnails
+        self.schedule_visible_update()
 
     def show(self, toggled=False):
         """Show thumbnails when called from toggle.
@@ -164,19 +179,18 @@ class Thumbnail(object):
         self.iconview.show()
         self.toggled = True
 
-        # Add initial placeholder for all thumbnails
-        default_pixbuf_max = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-            self.thumbnail_manager.default_icon,
-            *self.get_zoom_level(), True)
-        size = self.get_zoom_level()[0]
-        default_pixbuf = self.thumbnail_manager.scale_pixbuf(default_pixbuf_max,
-                                                             size)
+        # Add initial placeholder for all thumbnails. All rows share the same
+        # pixbuf and the model is detached from the iconview while filling so
+        # the iconview does not update its layout for every single row.
+        self.default_pixbuf = self._create_default_pixbuf()
+        self.iconview.set_model(None)
         for path in self.app.paths:
             name = self._get_name(path)
-            self.liststore.append([default_pixbuf, name])
-
-        # Generate thumbnails asynchronously
-        self.reload_all(ignore_cache=True)
+            self.liststore.append([self.default_pixbuf, name])
+        self.iconview.set_model(self.liststore)
+        self.loaded = set()
+        self.signatures = {}
+        self.generation += 1
 
         # Set columns
         self.calculate_columns()
@@ -186,18 +200,176 @@ class Thumbnail(object):
         pos = self.app.index % len(self.app.paths)
         self.move_to_pos(pos)
 
+        # Generate the visible thumbnails asynchronously
+        self.update_visible()
+
+    def _create_default_pixbuf(self):
+        default_pixbuf_max = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+            self.thumbnail_manager.default_icon,
+            *self.get_zoom_level(), True)
+        size = self.get_zoom_level()[0]
+        return self.thumbnail_manager.scale_pixbuf(default_pixbuf_max, size)
+
     def reload_all(self, ignore_cache=False):
+        """Reset all thumbnails to the placeholder and reload visible ones.
+
+        Args:
+            ignore_cache: If True bypass the in-memory thumbnail cache.
+        """
+        self.default_pixbuf = self._create_default_pixbuf()
+        # Detaching the model clears the cursor
+        pos = self.app.get_pos(force_widget="thu")
+        self.iconview.set_model(None)
+        for row in self.liststore:
+            row[0] = self.default_pixbuf
+        self.iconview.set_model(self.liststore)
+        if len(self.liststore):
+            self._focus(pos)
+        self.loaded = set()
+        self.generation += 1
+        if ignore_cache:
+            for path in self.app.paths:
+                self.thumbnail_manager.uncache(path)
+        self.update_visible()
+
+    def schedule_visible_update(self, *args):
+        """Update the visible thumbnails once the main loop is idle.
+
+        Scrolling emits many signals in a row, the update is only run once for
+        all of them.
+        """
+        if self.toggled and not self.timer_id:
+            self.timer_id = GLib.idle_add(self.update_visible)
+
+    def get_visible_range(self):
+        """Return the range of positions that should hold real thumbnails.
+
+        This is the range visible in the iconview extended by one screen above
+        and below.
+        """
+        last = len(self.app.paths) - 1
+        # PyGObject returns the start and end path or None instead of a tuple
+        # with a boolean
+        visible = self.iconview.get_visible_range()
+        if visible:
+            start, end = visible
+            first_visible = start.get_indices()[0]
+            last_visible = end.get_indices()[0]
+        else:  # Not drawn yet, guess from the current position
+            pos = self.app.get_pos(force_widget="thu")
+            first_visible = last_visible = pos
+        margin = max(last_visible - first_visible + 1,
+                     self.columns if self.columns else 1)
+        return range(max(first_visible - margin, 0),
+                     min(last_visible + margin, last) + 1)
+
+    def update_visible(self):
+        """Load thumbnails of visible positions and evict all others.
+
+        Evicted thumbnails are replaced by the placeholder pixbuf. Their pixbufs
+        remain in the bounded cache of the thumbnail manager so scrolling back
+        is cheap.
+        """
+        self.timer_id = 0
+        if not self.toggled or not self.app.paths:
+            return False
+        wanted = set(self.get_visible_range())
+        # pylint: disable=unsubscriptable-object
+        for position in self.loaded - wanted:
+            self.liststore[position][0] = self.default_pixbuf
+            self.signatures.pop(self.app.paths[position], None)
         size = self.get_zoom_level()[0]
-        for i, path in enumerate(self.app.paths):
+        for position in sorted(wanted - self.loaded):
+            path = self.app.paths[position]
+            self.signatures[path] = file_signature(path)
             self.thumbnail_manager.get_thumbnail_at_scale_async(
-                path, size, self._on_thumbnail_created, i,
-                ignore_cache=ignore_cache)
+                path, size, self._on_thumbnail_created, position,
+                self.generation)
+        self.loaded = wanted
+        return False  # To stop the idle callback
 
-    def _on_thumbnail_created(self, pixbuf, position):
+    def update_paths(self, old_paths):
+        """Update the liststore in place after paths changed on disk.
+
+        Rows of removed paths are removed, rows for new paths are inserted and
+        only thumbnails of files whose signature changed are recreated.
+
+        Args:
+            old_paths: The paths the liststore was created for.
+        """
+        new_paths = self.app.paths
+        remaining = [path for path in old_paths if path in new_paths]
+        # The in place update relies on the order of kept paths being the same,
+        # otherwise, e.g. when shuffling, just recreate everything
+        remaining_positions = [new_paths.index(path) for path in remaining]
+        if remaining_positions != sorted(remaining_positions):
+            self.show(True)
+            return
+        loaded_paths = [old_paths[position] for position in self.loaded]
+        # Detaching the model clears the cursor
+        pos = self.app.get_pos(force_widget="thu")
+        focused = old_paths[pos] if pos < len(old_paths) else None
+        self.iconview.set_model(None)
+        for position in reversed(range(len(old_paths))):
+            if old_paths[position] not in new_paths:
+                self.liststore.remove(self.liststore.get_iter(position))
+        i = 0
+        for position, path in enumerate(new_paths):
+            if i < len(remaining) and remaining[i] == path:
+                i += 1
+            else:
+                self.liststore.insert(
+                    position,
+                    [self.default_pixbuf, self._get_name(path)])
+        self.iconview.set_model(self.liststore)
+        if focused in new_paths:
+            self._focus(new_paths.index(focused))
+        elif new_paths:
+            self._focus(min(pos, len(new_paths) - 1))
+        # Requests which are still running refer to old positions
+        self.generation += 1
+        self.loaded = set()
+        size = self.get_zoom_level()[0]
+        for path in loaded_paths:
+            if path not in new_paths:
+                self.signatures.pop(path, None)
+                continue
+            position = new_paths.index(path)
+            self.loaded.add(position)
+            signature = file_signature(path)
+            changed = signature != self.signatures.get(path)
+            if changed:
+                self.thumbnail_manager.uncache(path)
+                self.signatures[path] = signature
+            self.thumbnail_manager.get_thumbnail_at_scale_async(
+                path, size, self._on_thumbnail_created, position,
+                self.generation, ignore_cache=changed)
+        self.schedule_visible_update()
+
+    def append(self, amount):
+        """Add rows for paths that were appended to the filelist.
+
+        Args:
+            amount: Number of paths appended to the end of app.paths.
+        """
+        for path in self.app.paths[len(self.app.paths) - amount:]:
+            self.liststore.append([self.default_pixbuf, self._get_name(path)])
+        # Thumbnails are only created once the rows become visible
+        self.schedule_visible_update()
+
+    def _on_thumbnail_created(self, pixbuf, position, generation=None):
+        # Thumbnail was requested for a different model or evicted since
+        if generation is not None and generation != self.generation \
+                or position not in self.loaded:
+            return
         # Subsctipting the liststore directly works fine
         # pylint: disable=unsubscriptable-object
         self.liststore[position][0] = pixbuf
-        self.move_to_pos(self.app.get_pos(force_widget="thu"))
+        # Keep the focused thumbnail in view, scrolling for any other row would
+        # snap the view back whenever scrolling loads new thumbnails
+        pos = self.app.get_pos(force_widget="thu")
+        if position == pos:
+            self.move_to_pos(pos)
 
     def _get_name(self, filename):
         name = os.path.splitext(os.path.basename(filename))[0]
@@ -221,9 +393,13 @@ class Thumbnail(object):
 
         # pylint: disable=unsubscriptable-object
         if reload_image:
-            self.thumbnail_manager.get_thumbnail_at_scale_async(
-                filename, self.get_zoom_level()[0],
-                self._on_thumbnail_created, index, ignore_cache=True)
+            # Rows outside the visible range are loaded once they are scrolled
+            # to, make sure the cached pixbuf is not used then
+            self.thumbnail_manager.uncache(filename)
+            if index in self.loaded:
+                self.thumbnail_manager.get_thumbnail_at_scale_async(
+                    filename, self.get_zoom_level()[0],
+                    self._on_thumbnail_created, index, ignore_cache=True)
         else:
             self.liststore[index][1] = name
 
@@ -285,12 +461,15 @@ class Thumbnail(object):
         Args:
             pos: The position to focus.
         """
+        self._focus(pos)
+        # Clear the user prefixed step
+        self.app["eventhandler"].num_clear()
+
+    def _focus(self, pos):
         self.iconview.select_path(Gtk.TreePath(pos))
         cell_renderer = self.iconview.get_cells()[0]
         self.iconview.set_cursor(Gtk.TreePath(pos), cell_renderer, False)
         self.iconview.scroll_to_path(Gtk.TreePath(pos), True, 0.5, 0.5)
-        # Clear the user prefixed step
-        self.app["eventhandler"].num_clear()
 
     def zoom(self, inc=True):
         """Zoom thumbnails.
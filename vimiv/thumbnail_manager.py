@@ -14,11 +14,13 @@ import hashlib
 import os
 import tempfile
 from multiprocessing.pool import ThreadPool as Pool
+from threading import Lock
 
 from PIL import Image
 from gi._error import GError
 from gi.repository import Gtk, GLib, GdkPixbuf
 from gi.repository.GdkPixbuf import Pixbuf
+from vimiv import editstack
 
 ThumbTuple = collections.namedtuple('ThumbTuple', ['original', 'thumbnail'])
 
@@ -32,6 +34,7 @@ class ThumbnailManager:
         default_icon: Default icon if thumbnails are not yet loaded.
         error_icon: The path to the icon which is used, when thumbnail creation
                     fails.
+        cache_size: Maximum amount of pixbufs kept in the in-memory cache.
     """
 
     _cpu_count = os.cpu_count()
@@ -41,7 +44,9 @@ class ThumbnailManager:
         _cpu_count -= 1
 
     _thread_pool = Pool(_cpu_count)
-    _cache = {}
+    _cache = collections.OrderedDict()
+    _cache_lock = Lock()
+    cache_size = 1024
 
     def __init__(self, large=True):
         """Construct a new ThumbnailManager.
@@ -62,20 +67,62 @@ class ThumbnailManager:
 
     def _do_get_thumbnail_at_scale(self, source_file, size, callback, args,
                                    ignore_cache=False):
-        if not ignore_cache and source_file in self._cache:
-            pixbuf = self._cache[source_file]
-        else:
+        pixbuf = None if ignore_cache else self._get_cached(source_file)
+        if pixbuf is None:
             thumbnail_path = self.thumbnail_store.get_thumbnail(source_file)
             if thumbnail_path is None:
-                thumbnail_path = self.error_icon
-            pixbuf = Pixbuf.new_from_file(thumbnail_path)
-            self._cache[source_file] = pixbuf
+                pixbuf = Pixbuf.new_from_file(self.error_icon)
+            else:
+                # Stored thumbnails show the file, edits are applied on top
+                pixbuf = editstack.apply_to_pixbuf(
+                    Pixbuf.new_from_file(thumbnail_path),
+                    editstack.load(source_file))
+            self._add_cached(source_file, pixbuf)
 
         if pixbuf.get_height() != size and pixbuf.get_width != size:
             pixbuf = self.scale_pixbuf(pixbuf, size)
 
         return callback, pixbuf, args
 
+    @staticmethod
+    def _get_mtime(source_file):
+        try:
+            return (os.path.getmtime(source_file),
+                    editstack.get_mtime(source_file))
+        except OSError:
+            return None
+
+    def _get_cached(self, source_file):
+        """Return the cached pixbuf of source_file if it is still current."""
+        mtime = self._get_mtime(source_file)
+        with self._cache_lock:
+            if source_file not in self._cache:
+                return None
+            cached_mtime, pixbuf = self._cache[source_file]
+            if cached_mtime != mtime:
+                del self._cache[source_file]
+                return None
+            self._cache.move_to_end(source_file)
+        return pixbuf
+
+    def _add_cached(self, source_file, pixbuf):
+        """Add pixbuf to the cache removing the least recently used ones."""
+        mtime = self._get_mtime(source_file)
+        with self._cache_lock:
+            self._cache[source_file] = (mtime, pixbuf)
+            self._cache.move_to_end(source_file)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def uncache(self, source_file):
+        """Remove the cached pixbuf of source_file from the in-memory cache.
+
+        Args:
+            source_file: The file of which the thumbnail should be removed.
+        """
+        with self._cache_lock:
+            self._cache.pop(source_file, None)
+
     @staticmethod
     def scale_pixbuf(pixbuf, size):
         """Scale the pixbuf to the given size keeping the aspect ratio.
@@ -240,8 +287,9 @@ class ThumbnailStore(object):
             return False
 
         try:
-            image = Pixbuf.new_from_file_at_scale(source_file, self.thumb_size,
-                                                  self.thumb_size, True)
+            image = Pixbuf.new_from_file_at_scale(
+                source_file, self.thumb_size, self.thumb_size,
+                True).apply_embedded_orientation()
             dest_path = self._get_thumbnail_path(thumbnail_filename)
             success = True
         except GError:
@@ -0,0 +1,119 @@
+# vim: ft=python fileencoding=utf-8 sw=4 et sts=4
+"""Watch directories for new images and append them to the filelist."""
+
+import os
+
+from gi.repository import Gio, GLib
+from vimiv.fileactions import is_image
+from vimiv.sorting import sort_paths
+
+
+class Watcher(object):
+    """Watch the directories of the current images using Gio.FileMonitor.
+
+    New images are appended to the paths, the thumbnail grid and the library
+    without populating the filelist again.
+
+    Attributes:
+        app: The main vimiv application to interact with.
+        enabled: If True watch directories for new images.
+        follow: If True move to the newest image once it appeared.
+        delay: Time in ms to wait for further files before adding them.
+        monitors: Dictionary of Gio.FileMonitors by directory.
+        pending: Set of files that appeared since the last update.
+        timer_id: ID of the timer adding pending files.
+    """
+
+    def __init__(self, app, settings):
+        """Set default values.
+
+        Args:
+            app: The main vimiv application to interact with.
+            settings: Settings from configfiles to use.
+        """
+        self.app = app
+        general = settings["GENERAL"]
+        self.enabled = general["watch"]
+        self.follow = general["watch_follow"]
+        self.delay = 200
+        self.monitors = {}
+        self.pending = set()
+        self.timer_id = 0
+
+    def watch_paths(self):
+        """Watch the directories of all paths or the current directory."""
+        if not self.enabled:
+            return
+        directories = {os.path.dirname(path) for path in self.app.paths}
+        if not directories:
+            directories = {os.getcwd()}
+        for directory in set(self.monitors) - directories:
+            self.monitors.pop(directory).cancel()
+        for directory in directories - set(self.monitors):
+            try:
+                monitor = Gio.File.new_for_path(directory).monitor_directory(
+                    Gio.FileMonitorFlags.WATCH_MOVES, None)
+            except GLib.Error:
+                self.app["statusbar"].message(
+                    "Cannot watch directory " + directory, "error")
+                continue
+            monitor.connect("changed", self.on_changed)
+            self.monitors[directory] = monitor
+
+    def is_watched(self, directory):
+        """Return True if directory is being watched for new images."""
+        return directory in self.monitors
+
+    def toggle(self):
+        """Toggle watching directories for new images."""
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.watch_paths()
+        else:
+            for monitor in self.monitors.values():
+                monitor.cancel()
+            self.monitors = {}
+            self.pending.clear()
+
+    def on_changed(self, monitor, gfile, other_file, event_type):
+        """Remember files which were completely written or moved in.
+
+        Args:
+            monitor: The Gio.FileMonitor that emitted the signal.
+            gfile: Gio.File that changed.
+            other_file: Gio.File of the new name if gfile was renamed.
+            event_type: Gio.FileMonitorEvent.
+        """
+        if event_type in [Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                          Gio.FileMonitorEvent.MOVED_IN]:
+            self.pending.add(gfile.get_path())
+        elif event_type == Gio.FileMonitorEvent.RENAMED:
+            self.pending.add(other_file.get_path())
+        else:
+            return
+        # Wait for further files, e.g. when copying a whole series
+        if not self.timer_id:
+            self.timer_id = GLib.timeout_add(self.delay, self.add_pending)
+
+    def add_pending(self):
+        """Append all new images to paths and update the widgets."""
+        self.timer_id = 0
+        new_images = [path for path in sort_paths(self.pending)
+                      if path not in self.app.paths and is_image(path)]
+        self.pending.clear()
+        if not new_images:
+            return False
+        first_image = not self.app.paths
+        self.app.paths.extend(new_images)
+        if self.app["thumbnail"].toggled:
+            self.app["thumbnail"].append(len(new_images))
+            if self.follow:
+                self.app["thumbnail"].move_to_pos(len(self.app.paths) - 1)
+        elif first_image:
+            self.app.index = len(self.app.paths) - 1 if self.follow else 0
+            self.app.show_paths()
+        elif self.follow:
+            self.app["image"].move_index(
+                delta=len(self.app.paths) - 1 - self.app.index)
+        self.app["statusbar"].update_info()
+        return False  # Only run once